@@ -1,16 +1,44 @@
 # Copyright: (c) OpenSpug Organization. https://github.com/openspug/spug
 # Copyright: (c) <spug.dev@gmail.com>
 # Released under the AGPL-3.0 License.
-from apps.host.models import Group
+from django.core.cache import cache
+from django.db import transaction
+from apps.host.models import Group, GroupClosure
+import uuid
 import re
 
+HOST_PERMS_VERSION = 'host_perms_version'
+
+
+def clear_host_perms_cache(user=None):
+    """清除主机权限缓存，未指定用户时通过更换版本号使所有用户的缓存失效
+
+    角色的分组权限、分组结构或分组下的主机变化后需要调用。在事务提交后才执行，
+    否则并发请求可能在提交前读到旧数据，并以新版本号缓存下来。
+    """
+    if user:
+        key = f'host_perms_{user.id}'
+        transaction.on_commit(lambda: cache.delete(key))
+    else:
+        transaction.on_commit(lambda: cache.set(HOST_PERMS_VERSION, uuid.uuid4().hex, None))
+
 
 def get_host_perms(user):
-    ids = sub_ids = set(user.group_perms)
-    while sub_ids:
-        sub_ids = [x.id for x in Group.objects.filter(parent_id__in=sub_ids)]
-        ids.update(sub_ids)
-    return set(x.host_id for x in Group.hosts.through.objects.filter(group_id__in=ids))
+    key = f'host_perms_{user.id}'
+    data = cache.get_many([HOST_PERMS_VERSION, key])
+    version = data.get(HOST_PERMS_VERSION)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.add(HOST_PERMS_VERSION, version, None)
+        version = cache.get(HOST_PERMS_VERSION, version)
+    elif data.get(key) and data[key][0] == version:
+        return data[key][1]
+
+    group_ids = GroupClosure.objects.filter(ancestor_id__in=user.group_perms).values('descendant_id')
+    queryset = Group.hosts.through.objects.filter(group_id__in=group_ids)
+    host_ids = set(queryset.values_list('host_id', flat=True))
+    cache.set(key, (version, host_ids), 86400)
+    return host_ids
 
 
 def has_host_perm(user, target):
@@ -9,7 +9,7 @@ from libs.utils import get_request_real_ip, generate_random_str
 from libs.push import send_login_code
 from apps.account.models import User, Role, History
 from apps.setting.utils import AppSetting
-from apps.account.utils import verify_password
+from apps.account.utils import verify_password, clear_host_perms_cache
 from libs.ldap import LDAP
 from functools import partial
 import user_agents
@@ -57,6 +57,7 @@ class UserView(AdminView):
                 )
             user.roles.set(role_ids)
             user.set_perms_cache()
+            clear_host_perms_cache(user)
         return json_response(error=error)
 
     def patch(self, request):
@@ -94,6 +95,7 @@ class UserView(AdminView):
                 user.deleted_by = request.user
                 user.roles.clear()
                 user.save()
+                clear_host_perms_cache(user)
         return json_response(error=error)
 
 
@@ -135,6 +137,8 @@ class RoleView(AdminView):
                 role.group_perms = json.dumps(form.group_perms)
             role.user_set.update(token_expired=0)
             role.save()
+            if form.group_perms is not None:
+                clear_host_perms_cache()
         return json_response(error=error)
 
     def delete(self, request):
@@ -5,6 +5,7 @@ from django.views.generic import View
 from django.db.models import F
 from libs import JsonParser, Argument, json_response, auth
 from apps.app.models import App, Deploy, DeployExtend1, DeployExtend2
+from apps.host.references import sync_host_refs
 from apps.config.models import Config, ConfigHistory, Service
 from apps.app.utils import fetch_versions, remove_repo
 from apps.setting.utils import AppSetting
@@ -158,6 +159,7 @@ class DeployView(View):
                     if extend.git_repo != extend_form.git_repo:
                         remove_repo(form.id)
                     Deploy.objects.filter(pk=form.id).update(**form)
+                    sync_host_refs('deploy', Deploy.objects.get(pk=form.id))
                     DeployExtend1.objects.filter(deploy_id=form.id).update(**extend_form)
                 else:
                     deploy = Deploy.objects.create(created_by=request.user, **form)
@@ -176,6 +178,7 @@ class DeployView(View):
                 extend_form.host_actions = json.dumps(extend_form.host_actions)
                 if form.id:
                     Deploy.objects.filter(pk=form.id).update(**form)
+                    sync_host_refs('deploy', Deploy.objects.get(pk=form.id))
                     DeployExtend2.objects.filter(deploy_id=form.id).update(**extend_form)
                 else:
                     deploy = Deploy.objects.create(created_by=request.user, **form)
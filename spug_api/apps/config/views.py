@@ -7,6 +7,7 @@ from libs import json_response, JsonParser, Argument, auth
 from apps.app.models import Deploy, App
 from apps.repository.models import Repository
 from apps.config.models import *
+from libs.rank import next_rank, move_rank
 import json
 import re
 
@@ -37,9 +38,7 @@ class EnvironmentView(View):
             if form.id:
                 Environment.objects.filter(pk=form.id).update(**form)
             else:
-                env = Environment.objects.create(created_by=request.user, **form)
-                env.sort_id = env.id
-                env.save()
+                Environment.objects.create(created_by=request.user, sort_id=next_rank(Environment.objects.all()), **form)
         return json_response(error=error)
 
     @auth('config.env.edit')
@@ -58,8 +57,7 @@ class EnvironmentView(View):
                 else:
                     tmp = Environment.objects.filter(sort_id__lt=env.sort_id).first()
                 if tmp:
-                    tmp.sort_id, env.sort_id = env.sort_id, tmp.sort_id
-                    tmp.save()
+                    move_rank(env, Environment.objects.all(), tmp, 1 if form.sort == 'up' else -1)
             env.save()
         return json_response(error=error)
 
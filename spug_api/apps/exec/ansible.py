@@ -160,20 +160,21 @@ def _dispatch_ansible(task_data):
             
             # 设置SSH密钥或密码认证
             ansible_vars = []
+            key_path = None
             for host in hosts:
                 if host.get('password'):
                     # 如果提供了密码，配置为使用密码认证
                     ansible_vars.append(f"ansible_ssh_pass={host['password']}")
                     print(f"主机 {host['ip']} 使用密码认证")
                 else:
-                    # 否则使用默认密钥
-                    with tempfile.NamedTemporaryFile(mode='w', delete=False) as key_file:
-                        key_path = key_file.name
-                        key_file.write(AppSetting.get('private_key'))
-                        key_file.flush()
-                        os.chmod(key_file.name, 0o600)
-                        ansible_vars.append(f"ansible_ssh_private_key_file={key_file.name}")
-                        print(f"主机 {host['ip']} 使用密钥认证，密钥文件: {key_file.name}")
+                    # 否则使用默认密钥，所有主机共用同一个密钥文件，随临时目录一起删除
+                    if key_path is None:
+                        key_path = os.path.join(temp_dir, 'private_key')
+                        with open(key_path, 'w') as key_file:
+                            key_file.write(AppSetting.get('private_key'))
+                        os.chmod(key_path, 0o600)
+                        ansible_vars.append(f"ansible_ssh_private_key_file={key_path}")
+                    print(f"主机 {host['ip']} 使用密钥认证，密钥文件: {key_path}")
             
             # 添加通用配置，增加连接超时设置
             ansible_vars.append("ansible_ssh_common_args='-o StrictHostKeyChecking=no -o ConnectTimeout=10'")
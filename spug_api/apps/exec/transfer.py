@@ -12,6 +12,7 @@ from apps.setting.utils import AppSetting
 from libs import json_response, JsonParser, Argument, auth
 from libs.utils import str_decode, human_seconds_time
 from concurrent import futures
+from contextlib import contextmanager, nullcontext
 from threading import Thread
 import subprocess
 import tempfile
@@ -97,19 +98,21 @@ def _dispatch_sync(task):
     rds = get_redis_connection()
     threads = []
     max_workers = max(10, os.cpu_count() * 5)
-    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        for host in Host.objects.filter(id__in=json.loads(task.host_ids)):
-            t = executor.submit(_do_sync, rds, task, host)
-            t.token = task.digest
-            t.key = host.id
-            threads.append(t)
-        for t in futures.as_completed(threads):
-            exc = t.exception()
-            if exc:
-                rds.publish(
-                    t.token,
-                    json.dumps({'key': t.key, 'status': -1, 'data': f'\x1b[31mException: {exc}\x1b[0m'})
-                )
+    # 未设置独立密钥的主机共用同一个全局密钥文件
+    with _key_file(AppSetting.get_default('private_key', '')) as key_path:
+        with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for host in Host.objects.filter(id__in=json.loads(task.host_ids)):
+                t = executor.submit(_do_sync, rds, task, host, key_path)
+                t.token = task.digest
+                t.key = host.id
+                threads.append(t)
+            for t in futures.as_completed(threads):
+                exc = t.exception()
+                if exc:
+                    rds.publish(
+                        t.token,
+                        json.dumps({'key': t.key, 'status': -1, 'data': f'\x1b[31mException: {exc}\x1b[0m'})
+                    )
     if task.host_id:
         command = f'umount -f {task.src_dir} && rm -rf {task.src_dir}'
     else:
@@ -118,18 +121,23 @@ def _dispatch_sync(task):
     close_old_connections()
 
 
-def _do_sync(rds, task, host):
-    token = task.digest
-    rds.publish(token, json.dumps({'key': host.id, 'data': '\r\n\x1b[36m### Executing ...\x1b[0m\r\n'}))
+@contextmanager
+def _key_file(pkey):
     with tempfile.NamedTemporaryFile(mode='w') as fp:
-        fp.write(host.pkey or AppSetting.get('private_key'))
+        fp.write(pkey)
         fp.write('\n')
         fp.flush()
+        yield fp.name
+
 
+def _do_sync(rds, task, host, key_path):
+    token = task.digest
+    rds.publish(token, json.dumps({'key': host.id, 'data': '\r\n\x1b[36m### Executing ...\x1b[0m\r\n'}))
+    with _key_file(host.pkey) if host.pkey else nullcontext(key_path) as key_path:
         flag = time.time()
         options = '-azv --progress' if task.host_id else '-rzv --progress'
         argument = f'{task.src_dir}/ {host.username}@{host.hostname}:{task.dst_dir}'
-        command = f'rsync {options} -h -e "ssh -p {host.port} -o StrictHostKeyChecking=no -i {fp.name}" {argument}'
+        command = f'rsync {options} -h -e "ssh -p {host.port} -o StrictHostKeyChecking=no -i {key_path}" {argument}'
         task = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
         message = b''
         while True:
@@ -6,7 +6,9 @@ from django_redis import get_redis_connection
 from django.conf import settings
 from libs import json_response, JsonParser, Argument, human_datetime, auth
 from apps.exec.models import ExecTemplate, ExecHistory
+from apps.host.references import sync_host_refs
 from apps.host.models import Host
+from apps.setting.utils import AppSetting
 from apps.account.utils import has_host_perm
 import uuid
 import json
@@ -36,7 +38,9 @@ class TemplateView(View):
             if form.id:
                 form.updated_at = human_datetime()
                 form.updated_by = request.user
-                ExecTemplate.objects.filter(pk=form.pop('id')).update(**form)
+                template_id = form.pop('id')
+                ExecTemplate.objects.filter(pk=template_id).update(**form)
+                sync_host_refs('exec_template', ExecTemplate.objects.get(pk=template_id))
             else:
                 form.created_by = request.user
                 ExecTemplate.objects.create(**form)
@@ -102,6 +106,7 @@ class TaskView(View):
                 term = {'width': form.cols, 'height': form.rows}
             rds = get_redis_connection()
             task = ExecHistory.objects.get(digest=form.token)
+            private_key = AppSetting.get_default('private_key')
             for host in Host.objects.filter(id__in=json.loads(task.host_ids)):
                 data = dict(
                     key=host.id,
@@ -112,7 +117,7 @@ class TaskView(View):
                     port=host.port,
                     username=host.username,
                     command=task.command,
-                    pkey=host.private_key,
+                    pkey=host.pkey or private_key,
                     params=json.loads(task.params),
                     term=term
                 )
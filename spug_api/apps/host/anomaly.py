@@ -0,0 +1,72 @@
+# Copyright: (c) OpenSpug Organization. https://github.com/openspug/spug
+# Copyright: (c) <spug.dev@gmail.com>
+# Released under the AGPL-3.0 License.
+from django.db import transaction
+from apps.host.models import CostAnomaly
+from apps.host.cube import get_cost_cube
+from numpy.lib.stride_tricks import sliding_window_view
+import numpy as np
+import warnings
+
+WINDOW = 6  # 与前几个月的费用比较
+MIN_POINTS = 3  # 窗口内至少有几个月的数据才参与检测
+THRESHOLD = 3.5  # 稳健Z分数超过该值视为异常
+MIN_SCALE = 100  # 离散程度的下限(分)，避免费用长期不变时微小波动被放大
+CHUNK_SIZE = 20000  # 每批处理的资源数，控制内存占用
+
+
+def detect_cost_anomalies(window=WINDOW, threshold=THRESHOLD):
+    """检测所有资源每月费用相对前window个月的异常波动，结果全量写入异常表
+
+    以窗口内费用的中位数为基准、MAD为离散程度计算稳健Z分数，
+    所有资源和月份在矩阵上一次算完，不逐个资源循环。
+
+    Returns:
+        int: 异常记录条数
+    """
+    cube = get_cost_cube()
+    instance_ids, months, matrix = cube.pivot()
+    # 每个资源取最后一条记录的名称和类型
+    name_codes = np.zeros(len(instance_ids), dtype=np.int64)
+    type_codes = np.zeros(len(instance_ids), dtype=np.int64)
+    name_codes[cube.instance_codes] = cube.name_codes
+    type_codes[cube.instance_codes] = cube.type_codes
+    # 没有费用记录的月份记为NaN，不参与中位数计算
+    present = np.zeros(matrix.shape, dtype=bool)
+    present[cube.instance_codes, cube.month_codes] = True
+    values = np.where(present, matrix, np.nan)
+
+    objects = []
+    # 月份数不足一个窗口时无法检测
+    size = len(instance_ids) if len(months) > window else 0
+    for start in range(0, size, CHUNK_SIZE):
+        chunk = values[start:start + CHUNK_SIZE]
+        # windows[:, j]是第j + window个月之前的window个月
+        windows = sliding_window_view(chunk, window, axis=1)[:, :-1]
+        current = chunk[:, window:]
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            median = np.nanmedian(windows, axis=2)
+            mad = np.nanmedian(np.abs(windows - median[..., None]), axis=2)
+        count = (~np.isnan(windows)).sum(axis=2)
+        scale = np.maximum(np.maximum(1.4826 * mad, 0.05 * np.abs(median)), MIN_SCALE)
+        with np.errstate(invalid='ignore'):
+            score = (current - median) / scale
+            flagged = (count >= MIN_POINTS) & ~np.isnan(current) & (np.abs(score) >= threshold)
+        for row, col in zip(*np.nonzero(flagged)):
+            index = start + row
+            objects.append(CostAnomaly(
+                month=months[col + window],
+                instance_id=instance_ids[index],
+                instance_name=cube.names[name_codes[index]] or instance_ids[index],
+                resource_type=cube.types[type_codes[index]],
+                price_cents=int(current[row, col]),
+                median_cents=int(round(median[row, col])),
+                score=round(float(score[row, col]), 2),
+                severity=round(abs(float(score[row, col])), 2)
+            ))
+
+    with transaction.atomic():
+        CostAnomaly.objects.all().delete()
+        CostAnomaly.objects.bulk_create(objects, batch_size=500)
+    return len(objects)
@@ -9,6 +9,8 @@ class HostConfig(AppConfig):
     verbose_name = '主机管理'
 
     def ready(self):
+        # 注册数据变更信号
+        from apps.host import signals  # noqa
         # 导入数据迁移模块
         from apps.host.init_data import init_asset_data
         # 初始化资产数据
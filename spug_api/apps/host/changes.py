@@ -0,0 +1,112 @@
+# Copyright: (c) OpenSpug Organization. https://github.com/openspug/spug
+# Copyright: (c) <spug.dev@gmail.com>
+# Released under the AGPL-3.0 License.
+from django.views.generic import View
+from django.db.models import Max
+from libs import json_response, JsonParser, Argument, auth
+from apps.host.models import ChangeLog, Instance, Disk, IP, Group, DataVersion
+from apps.host.utils import get_data_version
+
+TARGETS = {'instance': Instance, 'disk': Disk, 'ip': IP}
+GROUP_HOST = 'group_host'
+PRUNED_KEY = 'change_log_pruned'  # 已清理的最大变更记录ID，记录在DataVersion中
+
+
+def log_changes(target, action, keys=(None,)):
+    """记录变更，reset表示该类数据被整体重建（例如导入脚本直接写库），客户端需要全量同步"""
+    ChangeLog.objects.bulk_create([
+        ChangeLog(target=target, action=action, object_key=None if key is None else str(key))
+        for key in keys
+    ])
+
+
+def prune_changes(before):
+    """清理before之前的变更记录，落后于清理位置的客户端下次同步时会收到全量数据"""
+    version = ChangeLog.objects.filter(created_at__lt=before).aggregate(version=Max('id'))['version']
+    if version:
+        ChangeLog.objects.filter(id__lte=version).delete()
+        DataVersion.objects.update_or_create(key=PRUNED_KEY, defaults={'version': version})
+
+
+def group_host_key(group_id, host_id):
+    return f'{group_id}_{host_id}'
+
+
+def _fetch_group_hosts(keys=None):
+    queryset = Group.hosts.through.objects.all()
+    if keys is not None:
+        pairs = [tuple(map(int, x.split('_'))) for x in keys]
+        queryset = queryset.filter(group_id__in={x[0] for x in pairs}, host_id__in={x[1] for x in pairs})
+        keys = set(keys)
+    rows = {}
+    for group_id, host_id in queryset.values_list('group_id', 'host_id'):
+        key = group_host_key(group_id, host_id)
+        if keys is None or key in keys:
+            rows[key] = {'group_id': group_id, 'host_id': host_id}
+    return rows
+
+
+def _fetch_objects(model, keys=None):
+    queryset = model.objects.all()
+    if keys is not None:
+        queryset = queryset.filter(id__in=[int(x) for x in keys])
+    return {str(x.id): x.to_view() for x in queryset}
+
+
+def get_changes(since, limit=1000):
+    """返回since之后的变更，同一条记录的多次变更合并为最终结果
+
+    since为0或所需的变更记录已被清理时返回全量数据。
+    """
+    targets = list(TARGETS) + [GROUP_HOST]
+    actions = {x: {} for x in targets}
+    resets, more = set(), False
+    if since <= 0 or since < get_data_version(PRUNED_KEY):
+        resets.update(targets)
+        version = ChangeLog.objects.aggregate(version=Max('id'))['version'] or get_data_version(PRUNED_KEY)
+    else:
+        logs = list(ChangeLog.objects.filter(id__gt=since)[:limit + 1])
+        more = len(logs) > limit
+        logs = logs[:limit]
+        version = logs[-1].id if logs else since
+        for log in logs:
+            if log.action == 'reset':
+                resets.add(log.target)
+                actions[log.target].clear()
+            elif log.target not in resets:
+                prev = actions[log.target].get(log.object_key)
+                if log.action == 'delete':
+                    # 本次同步范围内新增又删除的记录客户端不需要知道
+                    actions[log.target][log.object_key] = None if prev == 'create' else 'delete'
+                elif prev != 'create':
+                    actions[log.target][log.object_key] = log.action
+
+    response = {'version': version, 'more': more, 'reset': sorted(resets)}
+    for target in targets:
+        fetch = _fetch_group_hosts if target == GROUP_HOST else lambda keys: _fetch_objects(TARGETS[target], keys)
+        data = response[target] = {'inserted': [], 'updated': [], 'deleted': []}
+        if target in resets:
+            data['inserted'] = list(fetch(None).values())
+            continue
+        changed = [k for k, v in actions[target].items() if v in ('create', 'update')]
+        rows = fetch(changed) if changed else {}
+        for key, action in actions[target].items():
+            if action is None:
+                continue
+            if action == 'delete' or key not in rows:
+                data['deleted'].append(int(key) if target in TARGETS else key)
+            else:
+                data['inserted' if action == 'create' else 'updated'].append(rows[key])
+    return response
+
+
+class ChangeView(View):
+    @auth('host.host.view')
+    def get(self, request):
+        form, error = JsonParser(
+            Argument('since', type=int, default=0, help='参数错误'),
+            Argument('limit', type=int, default=1000, filter=lambda x: 0 < x <= 5000, help='参数错误'),
+        ).parse(request.GET)
+        if error is None:
+            return json_response(get_changes(form.since, form.limit))
+        return json_response(error=error)
@@ -0,0 +1,33 @@
+# Copyright: (c) OpenSpug Organization. https://github.com/openspug/spug
+# Copyright: (c) <spug.dev@gmail.com>
+# Released under the AGPL-3.0 License.
+from django.db import transaction
+from apps.host.models import Group, GroupClosure
+
+
+def build_group_closure(parents):
+    """
+    Args:
+        parents (dict): 分组ID -> 上级分组ID，顶级分组的上级为0
+    Returns:
+        list: [(上级分组ID, 分组ID, 层级差)]，包括分组自身
+    """
+    rows = []
+    for group_id in parents:
+        ancestor_id, depth, seen = group_id, 0, set()
+        # 拖拽排序异常时可能形成环，遇到已访问的分组即停止
+        while ancestor_id in parents and ancestor_id not in seen:
+            seen.add(ancestor_id)
+            rows.append((ancestor_id, group_id, depth))
+            ancestor_id, depth = parents[ancestor_id], depth + 1
+    return rows
+
+
+def rebuild_group_closure():
+    """分组数量有限，分组新增、移动或删除后整体重建"""
+    parents = dict(Group.objects.values_list('id', 'parent_id'))
+    objects = [GroupClosure(ancestor_id=a, descendant_id=d, depth=n) for a, d, n in build_group_closure(parents)]
+    with transaction.atomic():
+        GroupClosure.objects.all().delete()
+        GroupClosure.objects.bulk_create(objects, batch_size=500)
+
@@ -0,0 +1,110 @@
+# Copyright: (c) OpenSpug Organization. https://github.com/openspug/spug
+# Copyright: (c) <spug.dev@gmail.com>
+# Released under the AGPL-3.0 License.
+from django.db import transaction
+from django.db.models import Count, Sum, Min, Max
+from apps.host.models import ResourceCost, ResourceCostSummary
+from decimal import Decimal, ROUND_HALF_UP
+
+
+# 把费用统一转换为整数分，兼容带¥符号和千分位的字符串
+def to_cents(value):
+    if isinstance(value, str):
+        value = value.replace('¥', '').replace(',', '').strip() or 0
+    return int((Decimal(str(value)) * 100).quantize(Decimal('1'), ROUND_HALF_UP))
+
+
+def from_cents(cents):
+    return (Decimal(cents) / 100).quantize(Decimal('0.01'))
+
+
+# 计算环比变化(%)，没有上月数据时为0
+def calc_change(price, prev_price):
+    if prev_price is None:
+        return 0
+    if prev_price > 0:
+        return round(float((price - prev_price) / prev_price) * 100, 2)
+    return 100 if price > 0 else 0
+
+
+def refresh_cost_change(months=None):
+    """重新计算费用记录的上月费用和环比变化
+
+    Args:
+        months (iterable): 数据有变动的月份，为None时全部重新计算
+    """
+    all_months = list(ResourceCost.objects.values_list('month', flat=True).distinct().order_by('month'))
+    if months is None:
+        targets = set(all_months)
+    else:
+        # 某月数据变动同时会影响下一个月的环比
+        months, targets = set(months), set()
+        for idx, month in enumerate(all_months):
+            if month in months or (idx > 0 and all_months[idx - 1] in months):
+                targets.add(month)
+
+    updates = []
+    for idx, month in enumerate(all_months):
+        if month not in targets:
+            continue
+        prev_prices = {}
+        if idx > 0:
+            # 包年包月和按量付费分别计算环比
+            queryset = ResourceCost.objects.filter(month=all_months[idx - 1]) \
+                .values_list('instance_id', 'resource_type', 'product_type', 'finance_price')
+            for instance_id, resource_type, product_type, price in queryset:
+                prev_prices[(instance_id, resource_type, product_type)] = price
+        queryset = ResourceCost.objects.filter(month=month) \
+            .only('id', 'instance_id', 'resource_type', 'product_type', 'finance_price', 'prev_price', 'change')
+        for item in queryset:
+            prev_price = prev_prices.get((item.instance_id, item.resource_type, item.product_type))
+            change = calc_change(item.finance_price, prev_price)
+            if item.prev_price != prev_price or item.change != change:
+                item.prev_price, item.change = prev_price, change
+                updates.append(item)
+    ResourceCost.objects.bulk_update(updates, ['prev_price', 'change'], batch_size=500)
+    return len(updates)
+
+
+# 趋势图分类与资源类型的对应关系
+COST_CATEGORIES = (('compute', 'ECS实例'), ('storage', '云盘'), ('network', '弹性IP'))
+
+
+def refresh_cost_summary(months=None):
+    """根据费用明细刷新月度汇总表
+
+    Args:
+        months (iterable): 数据有变动的月份，为None时全部重新汇总
+    """
+    queryset = ResourceCost.objects.all()
+    summaries = ResourceCostSummary.objects.all()
+    if months is not None:
+        months = list(months)
+        queryset = queryset.filter(month__in=months)
+        summaries = summaries.filter(month__in=months)
+    queryset = queryset.order_by().values('month', 'resource_type', 'product_type').annotate(
+        count=Count('id'),
+        total=Sum('price_cents'),
+        min_price=Min('price_cents'),
+        max_price=Max('price_cents')
+    )
+    objects = []
+    for item in queryset:
+        for key in ('total', 'min_price', 'max_price'):
+            item[key] = from_cents(item[key])
+        objects.append(ResourceCostSummary(**item))
+    with transaction.atomic():
+        summaries.delete()
+        ResourceCostSummary.objects.bulk_create(objects, batch_size=500)
+    return len(objects)
+
+
+def get_cost_totals(**filters):
+    """从月度汇总表查询费用
+
+    Returns:
+        dict: {(month, resource_type): total}
+    """
+    queryset = ResourceCostSummary.objects.filter(**filters).order_by() \
+        .values('month', 'resource_type').annotate(sum_total=Sum('total'))
+    return {(x['month'], x['resource_type']): float(x['sum_total']) for x in queryset}
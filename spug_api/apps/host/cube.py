@@ -0,0 +1,142 @@
+# Copyright: (c) OpenSpug Organization. https://github.com/openspug/spug
+# Copyright: (c) <spug.dev@gmail.com>
+# Released under the AGPL-3.0 License.
+from apps.host.models import ResourceCost
+from apps.host.utils import get_data_version
+from threading import Lock
+import numpy as np
+
+_cube = None
+_lock = Lock()
+
+
+# 字典编码，返回(取值列表, 每行对应的编码)，ordered为True时编码顺序与取值排序一致
+def _encode(values, ordered=False):
+    if ordered:
+        labels = sorted(set(values))
+        mapping = {x: i for i, x in enumerate(labels)}
+    else:
+        mapping = {}
+        for x in values:
+            mapping.setdefault(x, len(mapping))
+        labels = list(mapping)
+    codes = np.fromiter((mapping[x] for x in values), dtype=np.int32, count=len(values))
+    return labels, mapping, codes
+
+
+class CostCube:
+    """费用明细的进程内列式副本
+
+    实例ID、月份、类型等列做字典编码，费用以分为单位存为整数数组，
+    过滤、分组和排序都直接在数组上完成，不再访问数据库。
+    """
+    def __init__(self, version, rows):
+        self.version = version
+        columns = list(zip(*rows)) if rows else [()] * 9
+        ids, months, instance_ids, names, types, products, prices, changes, created_at = columns
+        self.ids = np.array(ids, dtype=np.int64)
+        self.months, self.month_index, self.month_codes = _encode(months, True)
+        self.instance_ids, self.instance_index, self.instance_codes = _encode(instance_ids, True)
+        self.names, _, self.name_codes = _encode(names)
+        self.types, self.type_index, self.type_codes = _encode(types)
+        self.products, self.product_index, self.product_codes = _encode(products)
+        self.created_at, _, self.created_codes = _encode(created_at)
+        self.cents = np.array(prices, dtype=np.int64)
+        self.changes = np.array(changes, dtype=np.float64)
+        # 预先计算各排序字段的全局顺序，相同取值按id排序
+        size = len(self.ids)
+        position = np.arange(size, dtype=np.int64)
+        self.orders = {'id': position}
+        for field, key in (('month', self.month_codes), ('finance_price', self.cents),
+                           ('instance_id', self.instance_codes)):
+            self.orders[field] = np.argsort(key.astype(np.int64) * max(size, 1) + position, kind='stable')
+
+    @classmethod
+    def load(cls, version):
+        queryset = ResourceCost.objects.order_by('id').values_list(
+            'id', 'month', 'instance_id', 'instance_name', 'resource_type', 'product_type',
+            'price_cents', 'change', 'created_at')
+        return cls(version, list(queryset.iterator(chunk_size=5000)))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def filter(self, months=None, resource_type=None, product_type=None, search=None):
+        """按条件过滤，返回布尔掩码"""
+        mask = np.ones(len(self), dtype=bool)
+        if months is not None:
+            codes = [self.month_index[x] for x in months if x in self.month_index]
+            mask &= np.isin(self.month_codes, codes)
+        if resource_type:
+            mask &= self.type_codes == self.type_index.get(resource_type, -1)
+        if product_type:
+            mask &= self.product_codes == self.product_index.get(product_type, -1)
+        if search:
+            # 子串匹配只在去重后的取值上进行，再通过编码映射回每一行
+            search = search.lower()
+            matched_ids = np.array([search in x.lower() for x in self.instance_ids] or [False])
+            matched_names = np.array([bool(x) and search in x.lower() for x in self.names] or [False])
+            mask &= matched_ids[self.instance_codes] | matched_names[self.name_codes]
+        return mask
+
+    def sort(self, mask, sort_by='-month'):
+        """返回按sort_by排序后的命中行号"""
+        field = sort_by.lstrip('-')
+        order = self.orders.get(field, self.orders['month'])
+        if field not in self.orders or sort_by.startswith('-'):
+            order = order[::-1]
+        return order[mask[order]]
+
+    def group_by(self, field, mask):
+        """按month/type/product分组统计，返回{取值: (条数, 费用分)}"""
+        labels = {'month': self.months, 'type': self.types, 'product': self.products}[field]
+        codes = getattr(self, f'{field}_codes')[mask]
+        counts = np.bincount(codes, minlength=len(labels))
+        totals = np.bincount(codes, weights=self.cents[mask], minlength=len(labels))
+        return {x: (int(counts[i]), int(totals[i])) for i, x in enumerate(labels) if counts[i]}
+
+    def pivot(self):
+        """按实例和月份汇总费用，返回(实例ID列表, 月份列表, 费用矩阵(分))"""
+        matrix = np.zeros((len(self.instance_ids), len(self.months)), dtype=np.int64)
+        np.add.at(matrix, (self.instance_codes, self.month_codes), self.cents)
+        return self.instance_ids, self.months, matrix
+
+    def to_views(self, rows):
+        columns = zip(
+            self.ids[rows].tolist(),
+            self.month_codes[rows].tolist(),
+            self.instance_codes[rows].tolist(),
+            self.name_codes[rows].tolist(),
+            self.type_codes[rows].tolist(),
+            self.product_codes[rows].tolist(),
+            self.cents[rows].tolist(),
+            self.changes[rows].tolist(),
+            self.created_codes[rows].tolist(),
+        )
+        data = []
+        for pk, month, instance, name, type_, product, cents, change, created_at in columns:
+            data.append({
+                'id': pk,
+                'month': self.months[month],
+                'instance_id': self.instance_ids[instance],
+                'instance_name': self.names[name] or self.instance_ids[instance],
+                'resource_type': self.types[type_],
+                'product_type': self.products[product],
+                'finance_price': '%.2f' % (cents / 100),
+                'change': change,
+                'created_at': self.created_at[created_at]
+            })
+        return data
+
+
+def get_cost_cube():
+    """获取当前进程的费用数据副本，导入脚本更新数据版本后自动重新加载"""
+    global _cube
+    version = get_data_version('cost')
+    cube = _cube
+    if cube is None or cube.version != version:
+        with _lock:
+            if _cube is None or _cube.version != version:
+                _cube = CostCube.load(version)
+            cube = _cube
+    return cube
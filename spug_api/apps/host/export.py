@@ -0,0 +1,136 @@
+# Copyright: (c) OpenSpug Organization. https://github.com/openspug/spug
+# Copyright: (c) <spug.dev@gmail.com>
+# Released under the AGPL-3.0 License.
+from django.http import StreamingHttpResponse, FileResponse
+from django.db.models import Q
+from libs import json_response, JsonParser, Argument
+from apps.host.models import ResourceCost, Instance, Disk, IP, CDN
+from apps.host.utils import filter_by_owner
+from openpyxl import Workbook
+from urllib.parse import quote
+import tempfile
+import time
+import csv
+
+CHUNK_SIZE = 2000
+
+# 导出类型: (名称, 模型, [(字段, 表头)])
+EXPORTS = {
+    'cost': ('资源费用', ResourceCost, [
+        ('month', '月份'),
+        ('instance_id', '实例ID'),
+        ('instance_name', '实例名称'),
+        ('resource_type', '资源类型'),
+        ('product_type', '计费类型'),
+        ('finance_price', '费用'),
+        ('change', '环比(%)'),
+    ]),
+    'instance': ('实例', Instance, [
+        ('instance_id', '实例ID'),
+        ('name', '名称'),
+        ('internal_ip', '内网IP'),
+        ('public_ip', '公网IP'),
+        ('status', '状态'),
+        ('zone_name', '可用区'),
+        ('cpu_count', 'CPU(核)'),
+        ('memory_capacity_in_gb', '内存(GB)'),
+        ('os_name', '操作系统'),
+        ('payment_timing', '付费类型'),
+        ('create_time', '创建时间'),
+        ('expire_time', '过期时间'),
+    ]),
+    'disk': ('磁盘', Disk, [
+        ('disk_id', '磁盘ID'),
+        ('name', '名称'),
+        ('server_id', '挂载实例'),
+        ('size_in_gb', '容量(GB)'),
+        ('storage_type', '类型'),
+        ('status', '状态'),
+        ('create_time', '创建时间'),
+        ('expire_time', '过期时间'),
+    ]),
+    'ip': ('IP地址', IP, [
+        ('eip', 'IP地址'),
+        ('name', '名称'),
+        ('status', '状态'),
+        ('instance', '关联实例'),
+        ('paymentTiming', '付费类型'),
+        ('billingMethod', '计费方式'),
+        ('createTime', '创建时间'),
+        ('expireTime', '过期时间'),
+    ]),
+    'cdn': ('CDN', CDN, [
+        ('name', '名称'),
+        ('domain', '域名'),
+        ('type', '类型'),
+        ('bandwidth', '带宽(Mbps)'),
+        ('status', '状态'),
+        ('created_at', '创建时间'),
+    ]),
+}
+
+
+class Echo:
+    """csv.writer的写入目标，直接返回写入的内容"""
+    def write(self, value):
+        return value
+
+
+def get_queryset(request, model):
+    if model is not ResourceCost:
+        # 与列表接口保持一致的数据范围
+        return filter_by_owner(model.objects.all(), request.user)
+    queryset = model.objects.all()
+    for key in ('month', 'resource_type', 'product_type'):
+        if request.GET.get(key):
+            queryset = queryset.filter(**{key: request.GET[key]})
+    search = request.GET.get('search')
+    if search:
+        queryset = queryset.filter(Q(instance_id__icontains=search) | Q(instance_name__icontains=search))
+    return queryset
+
+
+def iter_rows(queryset, fields):
+    return queryset.values_list(*fields).iterator(chunk_size=CHUNK_SIZE)
+
+
+def stream_csv(headers, rows):
+    writer = csv.writer(Echo())
+    # 带BOM，Excel打开时中文不乱码
+    yield '\ufeff' + writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def build_xlsx(title, headers, rows):
+    """只写模式逐行写入临时文件，内存占用与行数无关"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+    sheet.append(headers)
+    for row in rows:
+        sheet.append(row)
+    file = tempfile.TemporaryFile()
+    workbook.save(file)
+    file.seek(0)
+    return file
+
+
+def export_data(request):
+    form, error = JsonParser(
+        Argument('type', filter=lambda x: x in EXPORTS, help='请指定导出类型'),
+        Argument('format', filter=lambda x: x in ('csv', 'xlsx'), default='csv', help='不支持的导出格式'),
+    ).parse(request.GET)
+    if error is None:
+        title, model, columns = EXPORTS[form.type]
+        fields, headers = zip(*columns)
+        rows = iter_rows(get_queryset(request, model), fields)
+        filename = quote(f'{title}_{time.strftime("%Y%m%d%H%M%S")}.{form.format}')
+        if form.format == 'csv':
+            response = StreamingHttpResponse(stream_csv(headers, rows), content_type='text/csv; charset=utf-8')
+        else:
+            response = FileResponse(
+                build_xlsx(title, headers, rows),
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        response['Content-Disposition'] = f"attachment; filename*=UTF-8''{filename}"
+        return response
+    return json_response(error=error)
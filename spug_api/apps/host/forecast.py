@@ -0,0 +1,139 @@
+# Copyright: (c) OpenSpug Organization. https://github.com/openspug/spug
+# Copyright: (c) <spug.dev@gmail.com>
+# Released under the AGPL-3.0 License.
+from apps.host.cost import COST_CATEGORIES, get_cost_totals
+from apps.host.cube import get_cost_cube
+from apps.host.utils import get_data_versions
+from libs.cache import cached
+from functools import partial
+import numpy as np
+
+SEASONAL_MONTHS = 24  # 至少两个完整周期才拟合季节项
+HARMONICS = 2  # 季节项使用的傅里叶阶数
+Z_SCORE = 1.96  # 95%置信区间
+MIN_OBSERVED_MONTHS = 3  # 实例至少有这么多个月的数据才做预测
+
+
+def month_ordinal(month):
+    year, month = month.split('-')
+    return int(year) * 12 + int(month) - 1
+
+
+def ordinal_month(ordinal):
+    return f'{ordinal // 12}-{ordinal % 12 + 1:02d}'
+
+
+class CostModel:
+    """趋势 + 季节的线性模型
+
+    多条月度费用序列共用同一个设计矩阵，一次最小二乘即可求出所有序列的参数，
+    费用类型汇总和每个实例的费用都可以批量拟合。
+    """
+    def __init__(self, ordinals, values):
+        """
+        Args:
+            ordinals (list): 有数据的月份序号（year * 12 + month - 1），升序
+            values (ndarray): (序列数, 月份数)的费用矩阵
+        """
+        self.ordinals = np.asarray(ordinals, dtype=np.int64)
+        self.values = np.asarray(values, dtype=np.float64).reshape(-1, len(self.ordinals))
+        size = len(self.ordinals)
+        self.origin = int(self.ordinals[0]) if size else 0
+        self.last = int(self.ordinals[-1]) if size else -1
+        # 数据太少时逐步退化为只拟合趋势或均值
+        if size >= SEASONAL_MONTHS:
+            self.terms = 2 + 2 * HARMONICS
+        elif size >= 3:
+            self.terms = 2
+        else:
+            self.terms = 1
+        if not size:
+            self.coef = np.zeros((self.terms, len(self.values)))
+            self.sigma = np.zeros(len(self.values))
+            self.cov = np.zeros((self.terms, self.terms))
+            return
+        x = self._design(self.ordinals)
+        self.coef = np.linalg.lstsq(x, self.values.T, rcond=None)[0]
+        residuals = self.values.T - x @ self.coef
+        self.sigma = np.sqrt((residuals ** 2).sum(axis=0) / max(size - self.terms, 1))
+        self.cov = np.linalg.pinv(x.T @ x)
+
+    def _design(self, ordinals):
+        t = np.asarray(ordinals, dtype=np.float64)
+        columns = [np.ones_like(t), t - self.origin]
+        angle = 2 * np.pi * (t % 12) / 12
+        for k in range(1, HARMONICS + 1):
+            columns.extend((np.sin(k * angle), np.cos(k * angle)))
+        return np.column_stack(columns)[:, :self.terms]
+
+    def predict(self, ordinals):
+        """返回各序列在指定月份的预测值和预测标准差，形状均为(序列数, 月份数)"""
+        x = self._design(ordinals)
+        mean = (x @ self.coef).T
+        leverage = np.einsum('ij,jk,ik->i', x, self.cov, x)
+        std = self.sigma[:, None] * np.sqrt(1 + leverage)[None, :]
+        return mean, std
+
+    def project(self, ordinals):
+        """已有数据的月份返回实际费用，之后的月份返回预测费用
+
+        Returns:
+            tuple: (费用, 标准差, 是否为预测值)，前两个形状为(序列数, 月份数)
+        """
+        ordinals = np.asarray(ordinals, dtype=np.int64)
+        predicted = ordinals > self.last
+        values = np.zeros((len(self.values), len(ordinals)))
+        std = np.zeros_like(values)
+        found = np.isin(ordinals, self.ordinals)
+        values[:, found] = self.values[:, np.searchsorted(self.ordinals, ordinals[found])]
+        if predicted.any():
+            mean, deviation = self.predict(ordinals[predicted])
+            values[:, predicted] = np.maximum(mean, 0)
+            std[:, predicted] = deviation
+        return values, std, predicted
+
+
+@cached('cost_model', 24 * 60 * 60, partial(get_data_versions, 'cost'))
+def get_cost_model():
+    """按费用类型拟合月度汇总，导入新的费用数据后重新拟合"""
+    totals = get_cost_totals()
+    ordinals = sorted({month_ordinal(month) for month, _ in totals})
+    values = [[totals.get((ordinal_month(x), resource_type), 0) for x in ordinals]
+              for _, resource_type in COST_CATEGORIES]
+    return CostModel(ordinals, values)
+
+
+def forecast_instances(steps=3):
+    """批量拟合所有实例的月度费用并预测之后steps个月
+
+    每个实例只在其有费用记录的区间（首个月到最后一个月）内拟合，区间外补的0不参与拟合。
+    最近一个月没有费用记录（已释放）或数据不足MIN_OBSERVED_MONTHS个月的实例不做预测。
+    起始月份相同的实例共用设计矩阵，按起始月份分组批量拟合。
+
+    Returns:
+        tuple: (实例ID列表, 月份列表, 预测费用, 标准差)，费用矩阵形状为(实例数, steps)
+    """
+    cube = get_cost_cube()
+    instance_ids, months, matrix = cube.pivot()
+    ordinals = np.array([month_ordinal(x) for x in months], dtype=np.int64)
+    size = len(ordinals)
+    last = int(ordinals[-1]) if size else -1
+    horizon = list(range(last + 1, last + 1 + steps))
+    if not size:
+        return [], [ordinal_month(x) for x in horizon], np.zeros((0, steps)), np.zeros((0, steps))
+
+    observed = np.zeros(matrix.shape, dtype=bool)
+    observed[cube.instance_codes, cube.month_codes] = True
+    first = observed.argmax(axis=1)
+    latest = observed[:, -1]
+    rows = np.flatnonzero(latest & (size - first >= MIN_OBSERVED_MONTHS))
+
+    mean = np.zeros((len(rows), steps))
+    std = np.zeros_like(mean)
+    starts = first[rows]
+    for start in np.unique(starts).tolist():
+        group = np.flatnonzero(starts == start)
+        model = CostModel(ordinals[start:], matrix[rows[group], start:] / 100)
+        mean[group], std[group] = model.predict(horizon)
+    instance_ids = [instance_ids[x] for x in rows.tolist()]
+    return instance_ids, [ordinal_month(x) for x in horizon], np.maximum(mean, 0), std
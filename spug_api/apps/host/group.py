@@ -2,20 +2,31 @@
 # Copyright: (c) <spug.dev@gmail.com>
 # Released under the AGPL-3.0 License.
 from django.views.generic import View
-from django.db.models import F
 from libs import json_response, JsonParser, Argument, auth
 from apps.host.models import Group
+from apps.host.utils import get_data_versions, bump_data_version
 from apps.account.models import Role
+from libs.cache import cached
+from libs.rank import next_rank, move_rank
+from functools import partial
 
 
-def fetch_children(data, with_hosts):
-    if data:
-        sub_data = dict()
-        for item in Group.objects.filter(parent_id__in=data.keys()):
-            tmp = item.to_view(with_hosts)
-            sub_data[item.id] = tmp
-            data[item.parent_id]['children'].append(tmp)
-        return fetch_children(sub_data, with_hosts)
+def build_tree(with_hosts):
+    """一次查询分组、一次查询分组下的主机，在内存中组装分组树"""
+    groups = list(Group.objects.all())
+    nodes = {x.id: dict(key=x.id, value=x.id, title=x.name, children=[]) for x in groups}
+    if with_hosts:
+        rels = Group.hosts.through.objects.order_by('-host_id')
+        for group_id, host_id, name, hostname in rels.values_list('group_id', 'host_id', 'host__name', 'host__hostname'):
+            nodes[group_id]['children'].append(
+                dict(title=name, hostname=hostname, key=f'{group_id}_{host_id}', id=host_id, isLeaf=True))
+    tree = []
+    for item in groups:
+        if item.parent_id == 0:
+            tree.append(nodes[item.id])
+        elif item.parent_id in nodes:
+            nodes[item.parent_id]['children'].append(nodes[item.id])
+    return tree
 
 
 def merge_children(data, prefix, childes):
@@ -38,23 +49,30 @@ def filter_by_perm(data, result, ids):
                 filter_by_perm(item['children'], result, ids)
 
 
+@cached('host_group_tree', version=partial(get_data_versions, 'group'))
+def get_group_tree(with_hosts, group_perms=None):
+    """
+    Args:
+        with_hosts (bool): 是否包含分组下的主机
+        group_perms (tuple): 有权限的分组ID，为None时返回全部分组
+    """
+    tree_data, data2 = build_tree(with_hosts), dict()
+    if group_perms is not None:
+        tree_data, data = [], tree_data
+        filter_by_perm(data, tree_data, group_perms)
+    merge_children(data2, '', tree_data)
+    return {'treeData': tree_data, 'groups': data2}
+
+
 class GroupView(View):
     def get(self, request):
-        with_hosts = request.GET.get('with_hosts')
-        data, data2 = dict(), dict()
-        for item in Group.objects.filter(parent_id=0):
-            data[item.id] = item.to_view(with_hosts)
-        fetch_children(data, with_hosts)
-        if not data:
-            grp = Group.objects.create(name='Default', sort_id=1)
-            data[grp.id] = grp.to_view()
-        if request.user.is_supper:
-            tree_data = list(data.values())
-        else:
-            tree_data, ids = [], request.user.group_perms
-            filter_by_perm(data.values(), tree_data, ids)
-        merge_children(data2, '', tree_data)
-        return json_response({'treeData': tree_data, 'groups': data2})
+        with_hosts = bool(request.GET.get('with_hosts'))
+        group_perms = None if request.user.is_supper else tuple(sorted(request.user.group_perms))
+        data = get_group_tree(with_hosts, group_perms)
+        if not data['treeData'] and not Group.objects.exists():
+            Group.objects.create(name='Default', sort_id=1)
+            data = get_group_tree(with_hosts, group_perms)
+        return json_response(data)
 
     @auth('admin')
     def post(self, request):
@@ -66,10 +84,9 @@ class GroupView(View):
         if error is None:
             if form.id:
                 Group.objects.filter(pk=form.id).update(name=form.name)
+                bump_data_version('group')
             else:
-                group = Group.objects.create(**form)
-                group.sort_id = group.id
-                group.save()
+                Group.objects.create(sort_id=next_rank(Group.objects.all()), **form)
         return json_response(error=error)
 
     @auth('admin')
@@ -84,21 +101,14 @@ class GroupView(View):
             dst = Group.objects.get(pk=form.d_id)
             if form.action == 0:
                 src.parent_id = dst.id
-                dst = Group.objects.filter(parent_id=dst.id).first()
+                dst = Group.objects.filter(parent_id=dst.id).exclude(pk=src.id).first()
                 if not dst:
                     src.save()
                     return json_response()
                 form.action = -1
             src.parent_id = dst.parent_id
-            if src.sort_id > dst.sort_id:
-                if form.action == -1:
-                    dst = Group.objects.filter(sort_id__gt=dst.sort_id).last()
-                Group.objects.filter(sort_id__lt=src.sort_id, sort_id__gte=dst.sort_id).update(sort_id=F('sort_id') + 1)
-            else:
-                if form.action == 1:
-                    dst = Group.objects.filter(sort_id__lt=dst.sort_id).first()
-                Group.objects.filter(sort_id__lte=dst.sort_id, sort_id__gt=src.sort_id).update(sort_id=F('sort_id') - 1)
-            src.sort_id = dst.sort_id
+            # action为-1时放在dst之前，分组按sort_id倒序显示
+            move_rank(src, Group.objects.all(), dst, 1 if form.action == -1 else -1)
             src.save()
         return json_response(error=error)
 
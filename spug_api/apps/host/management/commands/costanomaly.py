@@ -0,0 +1,19 @@
+# Copyright: (c) OpenSpug Organization. https://github.com/openspug/spug
+# Copyright: (c) <spug.dev@gmail.com>
+# Released under the AGPL-3.0 License.
+from django.core.management.base import BaseCommand
+from apps.host.anomaly import detect_cost_anomalies, WINDOW, THRESHOLD
+import time
+
+
+class Command(BaseCommand):
+    help = '重新检测费用异常'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-w', dest='window', type=int, default=WINDOW, help='与前几个月的费用比较')
+        parser.add_argument('-t', dest='threshold', type=float, default=THRESHOLD, help='异常阈值（稳健Z分数）')
+
+    def handle(self, *args, **options):
+        start = time.time()
+        count = detect_cost_anomalies(options['window'], options['threshold'])
+        self.stdout.write(self.style.SUCCESS(f'检测到 {count} 条费用异常，耗时 {time.time() - start:.2f} 秒'))
@@ -0,0 +1,39 @@
+# Copyright: (c) OpenSpug Organization. https://github.com/openspug/spug
+# Copyright: (c) <spug.dev@gmail.com>
+# Released under the AGPL-3.0 License.
+from django.core.management.base import BaseCommand, CommandError
+from apps.host.models import ResourceCost
+import re
+
+# 执行计划中出现以下内容说明需要全表扫描或额外排序
+BAD_PATTERNS = (
+    re.compile(r'\bSCAN (TABLE )?resource_costs\b(?!.*USING)'),  # SQLite
+    re.compile(r'USE TEMP B-TREE FOR ORDER BY'),  # SQLite
+    re.compile(r'Using filesort|\bALL\b'),  # MySQL
+)
+
+
+class Command(BaseCommand):
+    help = '检查费用查询的执行计划是否命中索引'
+
+    def handle(self, *args, **options):
+        sample = ResourceCost.objects.order_by().first()
+        month = sample.month if sample else '2024-01'
+        resource_type = sample.resource_type if sample else 'ECS实例'
+        instance_id = sample.instance_id if sample else 'i-xxxxxxxx'
+        queries = (
+            ('按月份和资源类型过滤', ResourceCost.objects.filter(month=month, resource_type=resource_type)),
+            ('单个实例的历史费用', ResourceCost.objects.filter(instance_id=instance_id).order_by('-month')),
+            ('按费用排序分页', ResourceCost.objects.filter(resource_type=resource_type, month=month)
+             .order_by('-price_cents')[:20]),
+        )
+        failed = False
+        for title, queryset in queries:
+            plan = queryset.explain()
+            ok = not any(x.search(plan) for x in BAD_PATTERNS)
+            failed = failed or not ok
+            style = self.style.SUCCESS if ok else self.style.ERROR
+            self.stdout.write(style(f'{title}: {"命中索引" if ok else "未命中索引"}'))
+            self.stdout.write(plan)
+        if failed:
+            raise CommandError('存在未命中索引的费用查询')
@@ -0,0 +1,46 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:32
+
+from django.db import migrations, models
+
+
+def init_cost_change(apps, schema_editor):
+    ResourceCost = apps.get_model('host', 'ResourceCost')
+    months = ResourceCost.objects.values_list('month', flat=True).distinct().order_by('month')
+    prev_prices, updates = {}, []
+    for month in months:
+        prices = {}
+        for item in ResourceCost.objects.filter(month=month).order_by('id'):
+            key = (item.instance_id, item.resource_type, item.product_type)
+            prices[key] = item.finance_price
+            prev_price = prev_prices.get(key)
+            if prev_price is None:
+                continue
+            if prev_price > 0:
+                item.change = round(float((item.finance_price - prev_price) / prev_price) * 100, 2)
+            else:
+                item.change = 100 if item.finance_price > 0 else 0
+            item.prev_price = prev_price
+            updates.append(item)
+        prev_prices = prices
+    ResourceCost.objects.bulk_update(updates, ['prev_price', 'change'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('host', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resourcecost',
+            name='change',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='resourcecost',
+            name='prev_price',
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(init_cost_change, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:34
+
+from django.db import migrations, models
+from django.db.models import Count, Sum, Min, Max
+import libs.mixins
+
+
+def init_cost_summary(apps, schema_editor):
+    ResourceCost = apps.get_model('host', 'ResourceCost')
+    ResourceCostSummary = apps.get_model('host', 'ResourceCostSummary')
+    queryset = ResourceCost.objects.order_by().values('month', 'resource_type', 'product_type').annotate(
+        count=Count('id'),
+        total=Sum('finance_price'),
+        min_price=Min('finance_price'),
+        max_price=Max('finance_price')
+    )
+    ResourceCostSummary.objects.bulk_create([ResourceCostSummary(**x) for x in queryset], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('host', '0002_resourcecost_change'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceCostSummary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.CharField(max_length=7)),
+                ('resource_type', models.CharField(max_length=20)),
+                ('product_type', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('min_price', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('max_price', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+            ],
+            options={
+                'db_table': 'resource_cost_summaries',
+                'ordering': ('month',),
+                'unique_together': {('month', 'resource_type', 'product_type')},
+            },
+            bases=(models.Model, libs.mixins.ModelMixin),
+        ),
+        migrations.RunPython(init_cost_summary, migrations.RunPython.noop),
+    ]
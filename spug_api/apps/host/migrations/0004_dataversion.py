@@ -0,0 +1,26 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:35
+
+from django.db import migrations, models
+import libs.mixins
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('host', '0003_resourcecostsummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50, unique=True)),
+                ('version', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'data_versions',
+            },
+            bases=(models.Model, libs.mixins.ModelMixin),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:37
+
+from django.db import migrations
+from importlib import import_module
+
+
+def merge_cost_records(apps, schema_editor):
+    ResourceCost = apps.get_model('host', 'ResourceCost')
+    ResourceCostSummary = apps.get_model('host', 'ResourceCostSummary')
+    records, merged, removed = {}, {}, []
+    for item in ResourceCost.objects.order_by('id'):
+        key = (item.month, item.instance_id, item.resource_type, item.product_type or '')
+        if key not in records:
+            records[key] = item
+            continue
+        # 同一资源同一月份的多笔费用合并累加，与导入脚本的规则一致
+        first = records[key]
+        first.finance_price += item.finance_price
+        first.instance_name = item.instance_name or first.instance_name
+        merged[key] = first
+        removed.append(item.id)
+    if not removed:
+        return
+    merged = list(merged.values())
+    ResourceCost.objects.bulk_update(merged, ['finance_price', 'instance_name'], batch_size=500)
+    for i in range(0, len(removed), 500):
+        ResourceCost.objects.filter(id__in=removed[i:i + 500]).delete()
+
+    # 重新计算环比和月度汇总
+    ResourceCost.objects.update(prev_price=None, change=0)
+    ResourceCostSummary.objects.all().delete()
+    import_module('apps.host.migrations.0002_resourcecost_change').init_cost_change(apps, schema_editor)
+    import_module('apps.host.migrations.0003_resourcecostsummary').init_cost_summary(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('host', '0004_dataversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_cost_records, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='resourcecost',
+            unique_together={('month', 'instance_id', 'resource_type', 'product_type')},
+        ),
+    ]
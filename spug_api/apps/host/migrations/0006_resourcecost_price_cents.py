@@ -0,0 +1,44 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:39
+
+from django.db import migrations, models
+from decimal import Decimal, ROUND_HALF_UP
+
+
+def init_price_cents(apps, schema_editor):
+    ResourceCost = apps.get_model('host', 'ResourceCost')
+    records = list(ResourceCost.objects.only('id', 'finance_price'))
+    for item in records:
+        item.price_cents = int((item.finance_price * 100).quantize(Decimal('1'), ROUND_HALF_UP))
+    ResourceCost.objects.bulk_update(records, ['price_cents'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('host', '0005_resourcecost_unique'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='resourcecost',
+            options={'ordering': ('-month', '-price_cents')},
+        ),
+        migrations.AddField(
+            model_name='resourcecost',
+            name='price_cents',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(init_price_cents, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='resourcecost',
+            index=models.Index(fields=['month', 'resource_type'], name='resource_co_month_80e5ab_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resourcecost',
+            index=models.Index(fields=['instance_id', 'month'], name='resource_co_instanc_cf1a50_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resourcecost',
+            index=models.Index(fields=['resource_type', 'month', 'price_cents'], name='resource_co_resourc_52ad80_idx'),
+        ),
+    ]
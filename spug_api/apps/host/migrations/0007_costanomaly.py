@@ -0,0 +1,43 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:45
+
+from django.db import migrations, models
+import libs.mixins
+import libs.utils
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('host', '0006_resourcecost_price_cents'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CostAnomaly',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.CharField(max_length=7)),
+                ('instance_id', models.CharField(max_length=64)),
+                ('instance_name', models.CharField(max_length=100, null=True)),
+                ('resource_type', models.CharField(max_length=20)),
+                ('price_cents', models.BigIntegerField()),
+                ('median_cents', models.BigIntegerField()),
+                ('score', models.FloatField()),
+                ('severity', models.FloatField()),
+                ('created_at', models.CharField(default=libs.utils.human_datetime, max_length=20)),
+            ],
+            options={
+                'db_table': 'cost_anomalies',
+                'ordering': ('-severity',),
+            },
+            bases=(models.Model, libs.mixins.ModelMixin),
+        ),
+        migrations.AddIndex(
+            model_name='costanomaly',
+            index=models.Index(fields=['-severity'], name='cost_anomal_severit_227ef0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='costanomaly',
+            index=models.Index(fields=['month', '-severity'], name='cost_anomal_month_a11641_idx'),
+        ),
+    ]
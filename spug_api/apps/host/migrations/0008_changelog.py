@@ -0,0 +1,30 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:49
+
+from django.db import migrations, models
+import libs.mixins
+import libs.utils
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('host', '0007_costanomaly'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target', models.CharField(max_length=20)),
+                ('object_key', models.CharField(max_length=64, null=True)),
+                ('action', models.CharField(choices=[('create', '新增'), ('update', '更新'), ('delete', '删除'), ('reset', '重建')], max_length=10)),
+                ('created_at', models.CharField(default=libs.utils.human_datetime, max_length=20)),
+            ],
+            options={
+                'db_table': 'host_change_logs',
+                'ordering': ('id',),
+            },
+            bases=(models.Model, libs.mixins.ModelMixin),
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:51
+
+from django.db import migrations, models
+import libs.mixins
+from collections import defaultdict
+import json
+
+
+def init_host_projection(apps, schema_editor):
+    Instance = apps.get_model('host', 'Instance')
+    Group = apps.get_model('host', 'Group')
+    HostProjection = apps.get_model('host', 'HostProjection')
+    group_ids = defaultdict(list)
+    for host_id, group_id in Group.hosts.through.objects.order_by('id').values_list('host_id', 'group_id'):
+        group_ids[host_id].append(group_id)
+    objects = []
+    for x in Instance.objects.all():
+        os_name = (x.os_name or '').lower()
+        objects.append(HostProjection(
+            id=x.id,
+            name=x.name,
+            hostname=x.internal_ip or x.public_ip or '',
+            desc=x.desc,
+            instance_id=x.instance_id,
+            cpu=x.cpu_count,
+            memory=x.memory_capacity_in_gb,
+            os_name=x.os_name or '',
+            os_type='linux' if 'linux' in os_name else ('windows' if 'windows' in os_name else ''),
+            private_ip_address=json.dumps([x.internal_ip] if x.internal_ip else []),
+            public_ip_address=json.dumps([x.public_ip] if x.public_ip else []),
+            expired_time=x.expire_time,
+            is_verified=x.status == 'Running',
+            status=x.status or 'Stopped',
+            group_ids=json.dumps(group_ids[x.id]),
+        ))
+    HostProjection.objects.bulk_create(objects, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('host', '0008_changelog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HostProjection',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100, null=True)),
+                ('hostname', models.CharField(default='', max_length=50)),
+                ('desc', models.CharField(max_length=255, null=True)),
+                ('instance_id', models.CharField(max_length=100)),
+                ('cpu', models.IntegerField(null=True)),
+                ('memory', models.FloatField(null=True)),
+                ('os_name', models.CharField(default='', max_length=50)),
+                ('os_type', models.CharField(default='', max_length=20)),
+                ('private_ip_address', models.TextField(default='[]')),
+                ('public_ip_address', models.TextField(default='[]')),
+                ('expired_time', models.CharField(max_length=50, null=True)),
+                ('is_verified', models.BooleanField(default=False)),
+                ('status', models.CharField(default='Stopped', max_length=20)),
+                ('group_ids', models.TextField(default='[]')),
+            ],
+            options={
+                'db_table': 'host_projections',
+                'ordering': ('-id',),
+            },
+            bases=(models.Model, libs.mixins.ModelMixin),
+        ),
+        migrations.AddIndex(
+            model_name='hostprojection',
+            index=models.Index(fields=['status'], name='host_projec_status_6e907c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hostprojection',
+            index=models.Index(fields=['os_type'], name='host_projec_os_type_caa4d4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hostprojection',
+            index=models.Index(fields=['name'], name='host_projec_name_e3936d_idx'),
+        ),
+        migrations.RunPython(init_host_projection, migrations.RunPython.noop),
+    ]
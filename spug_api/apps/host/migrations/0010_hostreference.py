@@ -0,0 +1,52 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:53
+
+from django.db import migrations, models
+import libs.mixins
+import json
+
+
+def init_host_references(apps, schema_editor):
+    HostReference = apps.get_model('host', 'HostReference')
+    sources = {
+        'deploy': (apps.get_model('app', 'Deploy'), 'host_ids'),
+        'task': (apps.get_model('schedule', 'Task'), 'targets'),
+        'detection': (apps.get_model('monitor', 'Detection'), 'targets'),
+        'exec_template': (apps.get_model('exec', 'ExecTemplate'), 'host_ids'),
+    }
+    objects = []
+    for source, (model, field) in sources.items():
+        for obj in model.objects.all():
+            if source == 'detection' and obj.type not in ('3', '4'):
+                continue
+            host_ids = {int(x) for x in json.loads(getattr(obj, field) or '[]') if str(x).isdigit()}
+            objects.extend(HostReference(source=source, source_id=obj.id, host_id=x) for x in host_ids)
+    HostReference.objects.bulk_create(objects, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('host', '0009_hostprojection'),
+        ('app', '0001_initial'),
+        ('schedule', '0001_initial'),
+        ('monitor', '0001_initial'),
+        ('exec', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HostReference',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('host_id', models.IntegerField(db_index=True)),
+                ('source', models.CharField(choices=[('deploy', '发布配置'), ('task', '任务计划'), ('detection', '监控任务'), ('exec_template', '执行模板')], max_length=20)),
+                ('source_id', models.IntegerField()),
+            ],
+            options={
+                'db_table': 'host_references',
+                'unique_together': {('source', 'source_id', 'host_id')},
+            },
+            bases=(models.Model, libs.mixins.ModelMixin),
+        ),
+        migrations.RunPython(init_host_references, migrations.RunPython.noop),
+    ]
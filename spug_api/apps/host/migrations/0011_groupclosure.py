@@ -0,0 +1,43 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:55
+
+from django.db import migrations, models
+import libs.mixins
+
+
+def init_group_closure(apps, schema_editor):
+    Group = apps.get_model('host', 'Group')
+    GroupClosure = apps.get_model('host', 'GroupClosure')
+    parents = dict(Group.objects.values_list('id', 'parent_id'))
+    objects = []
+    for group_id in parents:
+        ancestor_id, depth, seen = group_id, 0, set()
+        while ancestor_id in parents and ancestor_id not in seen:
+            seen.add(ancestor_id)
+            objects.append(GroupClosure(ancestor_id=ancestor_id, descendant_id=group_id, depth=depth))
+            ancestor_id, depth = parents[ancestor_id], depth + 1
+    GroupClosure.objects.bulk_create(objects, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('host', '0010_hostreference'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupClosure',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ancestor_id', models.IntegerField()),
+                ('descendant_id', models.IntegerField(db_index=True)),
+                ('depth', models.IntegerField()),
+            ],
+            options={
+                'db_table': 'host_group_closures',
+                'unique_together': {('ancestor_id', 'descendant_id')},
+            },
+            bases=(models.Model, libs.mixins.ModelMixin),
+        ),
+        migrations.RunPython(init_group_closure, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:58
+
+from django.db import migrations, models
+import libs.mixins
+
+FTS_SQL = [
+    "CREATE VIRTUAL TABLE asset_search_fts USING fts5("
+    "keywords, content='asset_search', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER asset_search_ai AFTER INSERT ON asset_search BEGIN "
+    "INSERT INTO asset_search_fts(rowid, keywords) VALUES (new.id, new.keywords); END",
+    "CREATE TRIGGER asset_search_ad AFTER DELETE ON asset_search BEGIN "
+    "INSERT INTO asset_search_fts(asset_search_fts, rowid, keywords) VALUES ('delete', old.id, old.keywords); END",
+    "CREATE TRIGGER asset_search_au AFTER UPDATE ON asset_search BEGIN "
+    "INSERT INTO asset_search_fts(asset_search_fts, rowid, keywords) VALUES ('delete', old.id, old.keywords); "
+    "INSERT INTO asset_search_fts(rowid, keywords) VALUES (new.id, new.keywords); END",
+]
+FTS_REVERSE_SQL = [
+    'DROP TRIGGER IF EXISTS asset_search_ai',
+    'DROP TRIGGER IF EXISTS asset_search_ad',
+    'DROP TRIGGER IF EXISTS asset_search_au',
+    'DROP TABLE IF EXISTS asset_search_fts',
+]
+
+
+def create_fts(apps, schema_editor):
+    # 全文索引只在SQLite下使用，其它数据库搜索时直接匹配asset_search表
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in FTS_SQL:
+            schema_editor.execute(sql)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in FTS_REVERSE_SQL:
+            schema_editor.execute(sql)
+
+
+def join_keywords(*values):
+    return '|' + '|'.join(str(x) for x in values if x) + '|'
+
+
+def init_asset_search(apps, schema_editor):
+    AssetSearch = apps.get_model('host', 'AssetSearch')
+    objects = []
+    for x in apps.get_model('host', 'Instance').objects.all():
+        keywords = join_keywords(x.instance_id, x.name, x.internal_ip, x.public_ip)
+        objects.append(AssetSearch(kind='instance', object_id=x.id, title=x.name or x.instance_id or '',
+                                   subtitle=x.instance_id or '', keywords=keywords))
+    for x in apps.get_model('host', 'Disk').objects.all():
+        keywords = join_keywords(x.disk_id, x.name, x.server_id)
+        objects.append(AssetSearch(kind='disk', object_id=x.id, title=x.name or '', subtitle=x.disk_id or '',
+                                   keywords=keywords))
+    for x in apps.get_model('host', 'IP').objects.all():
+        keywords = join_keywords(x.eip, x.name, x.instance)
+        objects.append(AssetSearch(kind='ip', object_id=x.id, title=x.eip or '', subtitle=x.name or '',
+                                   keywords=keywords))
+    for x in apps.get_model('host', 'CDN').objects.all():
+        objects.append(AssetSearch(kind='cdn', object_id=x.id, title=x.name or '', subtitle=x.domain or '',
+                                   keywords=join_keywords(x.name, x.domain), owner_id=x.created_by_id))
+    for x in apps.get_model('host', 'Storage').objects.all():
+        objects.append(AssetSearch(kind='storage', object_id=x.id, title=x.name or '', subtitle=x.type or '',
+                                   keywords=join_keywords(x.name), owner_id=x.created_by_id))
+    AssetSearch.objects.bulk_create(objects, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('host', '0011_groupclosure'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssetSearch',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('instance', '实例'), ('disk', '磁盘'), ('ip', 'IP地址'), ('cdn', 'CDN'), ('storage', '存储')], max_length=20)),
+                ('object_id', models.IntegerField()),
+                ('title', models.CharField(default='', max_length=255)),
+                ('subtitle', models.CharField(default='', max_length=255)),
+                ('keywords', models.TextField(default='')),
+                ('owner_id', models.IntegerField(null=True)),
+            ],
+            options={
+                'db_table': 'asset_search',
+                'unique_together': {('kind', 'object_id')},
+            },
+            bases=(models.Model, libs.mixins.ModelMixin),
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+        migrations.RunPython(init_asset_search, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 2.2.28 on 2026-10-18 20:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('host', '0012_assetsearch'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='disk',
+            index=models.Index(fields=['server_id'], name='disks_server__c960e4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='disk',
+            index=models.Index(fields=['disk_id'], name='disks_disk_id_9591e9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='instance',
+            index=models.Index(fields=['instance_id'], name='instances_instanc_9da05c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ip',
+            index=models.Index(fields=['instance'], name='ips_instanc_6f4601_idx'),
+        ),
+    ]
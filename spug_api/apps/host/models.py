@@ -103,6 +103,20 @@ class Group(models.Model, ModelMixin):
         ordering = ('-sort_id',)
 
 
+# 分组的闭包表，每个分组与其所有上级分组（包括自身）各有一条记录
+class GroupClosure(models.Model, ModelMixin):
+    ancestor_id = models.IntegerField()
+    descendant_id = models.IntegerField(db_index=True)
+    depth = models.IntegerField()  # 0表示分组自身
+
+    def __repr__(self):
+        return f'<GroupClosure {self.ancestor_id} -> {self.descendant_id}>'
+
+    class Meta:
+        db_table = 'host_group_closures'
+        unique_together = ('ancestor_id', 'descendant_id')
+
+
 # 磁盘模型
 class Disk(models.Model, ModelMixin):
     disk_id = models.CharField(max_length=100, null=True)
@@ -124,6 +138,10 @@ class Disk(models.Model, ModelMixin):
     class Meta:
         db_table = 'disks'
         ordering = ('-id',)
+        indexes = [
+            models.Index(fields=['server_id']),
+            models.Index(fields=['disk_id']),
+        ]
 
 
 # 存储模型
@@ -190,6 +208,9 @@ class IP(models.Model, ModelMixin):
     class Meta:
         db_table = 'ips'
         ordering = ('-id',)
+        indexes = [
+            models.Index(fields=['instance']),
+        ]
 
 
 # 资源费用模型
@@ -200,6 +221,9 @@ class ResourceCost(models.Model, ModelMixin):
     resource_type = models.CharField(max_length=20)  # ECS实例, 云盘, 弹性IP
     product_type = models.CharField(max_length=20)  # prepay, postpay
     finance_price = models.DecimalField(max_digits=10, decimal_places=2)
+    price_cents = models.BigIntegerField(default=0)  # 费用(分)，导入时由finance_price换算，用于排序和统计
+    prev_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)  # 上月费用，由导入脚本维护
+    change = models.FloatField(default=0)  # 环比变化(%)，由导入脚本维护
     created_at = models.CharField(max_length=20, default=human_datetime)
     
     def to_view(self):
@@ -210,7 +234,62 @@ class ResourceCost(models.Model, ModelMixin):
     
     class Meta:
         db_table = 'resource_costs'
-        ordering = ('-month', '-finance_price')
+        unique_together = ('month', 'instance_id', 'resource_type', 'product_type')
+        indexes = [
+            models.Index(fields=['month', 'resource_type']),
+            models.Index(fields=['instance_id', 'month']),
+            models.Index(fields=['resource_type', 'month', 'price_cents']),
+        ]
+        ordering = ('-month', '-price_cents')
+
+
+# 资源费用月度汇总，由导入脚本根据ResourceCost刷新
+class ResourceCostSummary(models.Model, ModelMixin):
+    month = models.CharField(max_length=7)  # 格式：YYYY-MM
+    resource_type = models.CharField(max_length=20)
+    product_type = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    def __repr__(self):
+        return f'<ResourceCostSummary {self.month} {self.resource_type} {self.product_type}>'
+
+    class Meta:
+        db_table = 'resource_cost_summaries'
+        unique_together = ('month', 'resource_type', 'product_type')
+        ordering = ('month',)
+
+
+# 费用异常记录，由导入脚本根据每个资源近几个月费用的中位数和MAD检测
+class CostAnomaly(models.Model, ModelMixin):
+    month = models.CharField(max_length=7)  # 格式：YYYY-MM
+    instance_id = models.CharField(max_length=64)
+    instance_name = models.CharField(max_length=100, null=True)
+    resource_type = models.CharField(max_length=20)
+    price_cents = models.BigIntegerField()  # 当月费用(分)
+    median_cents = models.BigIntegerField()  # 前几个月费用的中位数(分)
+    score = models.FloatField()  # 稳健Z分数，正数为上涨，负数为下降
+    severity = models.FloatField()  # 严重程度，即score的绝对值
+    created_at = models.CharField(max_length=20, default=human_datetime)
+
+    def to_view(self):
+        tmp = self.to_dict(excludes=('price_cents', 'median_cents'))
+        tmp['finance_price'] = '%.2f' % (self.price_cents / 100)
+        tmp['median_price'] = '%.2f' % (self.median_cents / 100)
+        return tmp
+
+    def __repr__(self):
+        return f'<CostAnomaly {self.instance_id} {self.month}>'
+
+    class Meta:
+        db_table = 'cost_anomalies'
+        indexes = [
+            models.Index(fields=['-severity']),
+            models.Index(fields=['month', '-severity']),
+        ]
+        ordering = ('-severity',)
 
 
 # 实例模型
@@ -241,3 +320,125 @@ class Instance(models.Model, ModelMixin):
     class Meta:
         db_table = 'instances'
         ordering = ('-id',)
+        indexes = [
+            models.Index(fields=['instance_id']),
+        ]
+
+
+# 主机列表的物化视图，实例或分组关系变更时由apps.host.projection维护
+class HostProjection(models.Model, ModelMixin):
+    id = models.IntegerField(primary_key=True)  # 与Instance.id一致
+    name = models.CharField(max_length=100, null=True)
+    hostname = models.CharField(max_length=50, default='')
+    desc = models.CharField(max_length=255, null=True)
+    instance_id = models.CharField(max_length=100)
+    cpu = models.IntegerField(null=True)
+    memory = models.FloatField(null=True)
+    os_name = models.CharField(max_length=50, default='')
+    os_type = models.CharField(max_length=20, default='')  # linux, windows
+    private_ip_address = models.TextField(default='[]')
+    public_ip_address = models.TextField(default='[]')
+    expired_time = models.CharField(max_length=50, null=True)
+    is_verified = models.BooleanField(default=False)
+    status = models.CharField(max_length=20, default='Stopped')
+    group_ids = models.TextField(default='[]')
+
+    def to_view(self):
+        tmp = self.to_dict()
+        tmp['port'] = 22  # 默认SSH端口
+        tmp['username'] = 'root'  # 默认用户名
+        tmp['private_ip_address'] = json.loads(self.private_ip_address)
+        tmp['public_ip_address'] = json.loads(self.public_ip_address)
+        tmp['group_ids'] = json.loads(self.group_ids)
+        return tmp
+
+    def __repr__(self):
+        return f'<HostProjection {self.id}>'
+
+    class Meta:
+        db_table = 'host_projections'
+        indexes = [
+            models.Index(fields=['status']),
+            models.Index(fields=['os_type']),
+            models.Index(fields=['name']),
+        ]
+        ordering = ('-id',)
+
+
+# 数据版本号，数据变更时递增，用于让各进程内的缓存失效
+class DataVersion(models.Model, ModelMixin):
+    key = models.CharField(max_length=50, unique=True)
+    version = models.IntegerField(default=0)
+
+    def __repr__(self):
+        return f'<DataVersion {self.key} {self.version}>'
+
+    class Meta:
+        db_table = 'data_versions'
+
+
+# 资产变更记录，id单调递增，客户端通过since参数增量同步
+class ChangeLog(models.Model, ModelMixin):
+    ACTIONS = (
+        ('create', '新增'),
+        ('update', '更新'),
+        ('delete', '删除'),
+        ('reset', '重建'),
+    )
+    target = models.CharField(max_length=20)  # instance, disk, ip, group_host
+    object_key = models.CharField(max_length=64, null=True)  # 记录ID，分组关系为"分组ID_主机ID"，reset时为空
+    action = models.CharField(max_length=10, choices=ACTIONS)
+    created_at = models.CharField(max_length=20, default=human_datetime)
+
+    def __repr__(self):
+        return f'<ChangeLog {self.id} {self.action} {self.target} {self.object_key}>'
+
+    class Meta:
+        db_table = 'host_change_logs'
+        ordering = ('id',)
+
+
+class HostReference(models.Model, ModelMixin):
+    SOURCES = (
+        ('deploy', '发布配置'),
+        ('task', '任务计划'),
+        ('detection', '监控任务'),
+        ('exec_template', '执行模板'),
+    )
+    host_id = models.IntegerField(db_index=True)
+    source = models.CharField(max_length=20, choices=SOURCES)
+    source_id = models.IntegerField()
+
+    def __repr__(self):
+        return f'<HostReference {self.source}:{self.source_id} -> {self.host_id}>'
+
+    class Meta:
+        db_table = 'host_references'
+        unique_together = ('source', 'source_id', 'host_id')
+
+
+# 资产全局搜索索引，SQLite下由触发器同步到asset_search_fts全文索引（trigram分词）
+class AssetSearch(models.Model, ModelMixin):
+    KINDS = (
+        ('instance', '实例'),
+        ('disk', '磁盘'),
+        ('ip', 'IP地址'),
+        ('cdn', 'CDN'),
+        ('storage', '存储'),
+    )
+    kind = models.CharField(max_length=20, choices=KINDS)
+    object_id = models.IntegerField()
+    title = models.CharField(max_length=255, default='')
+    subtitle = models.CharField(max_length=255, default='')
+    keywords = models.TextField(default='')  # 以|分隔的可搜索字段，首尾也带|
+    owner_id = models.IntegerField(null=True)  # 创建人，用于非管理员的数据范围
+
+    def to_view(self):
+        return self.to_dict(selects=('kind', 'object_id', 'title', 'subtitle'))
+
+    def __repr__(self):
+        return f'<AssetSearch {self.kind}:{self.object_id}>'
+
+    class Meta:
+        db_table = 'asset_search'
+        unique_together = ('kind', 'object_id')
@@ -0,0 +1,60 @@
+# Copyright: (c) OpenSpug Organization. https://github.com/openspug/spug
+# Copyright: (c) <spug.dev@gmail.com>
+# Released under the AGPL-3.0 License.
+from django.db import transaction
+from apps.host.models import Instance, Group, HostProjection
+from collections import defaultdict
+import json
+
+
+def get_os_type(os_name):
+    os_name = (os_name or '').lower()
+    if 'linux' in os_name:
+        return 'linux'
+    if 'windows' in os_name:
+        return 'windows'
+    return ''
+
+
+def build_projection(instance, group_ids):
+    return HostProjection(
+        id=instance.id,
+        name=instance.name,
+        hostname=instance.internal_ip or instance.public_ip or '',
+        desc=instance.desc,
+        instance_id=instance.instance_id,
+        cpu=instance.cpu_count,
+        memory=instance.memory_capacity_in_gb,
+        os_name=instance.os_name or '',
+        os_type=get_os_type(instance.os_name),
+        private_ip_address=json.dumps([instance.internal_ip] if instance.internal_ip else []),
+        public_ip_address=json.dumps([instance.public_ip] if instance.public_ip else []),
+        expired_time=instance.expire_time,
+        is_verified=instance.status == 'Running',
+        status=instance.status or 'Stopped',
+        group_ids=json.dumps(group_ids),
+    )
+
+
+def refresh_host_projection(ids=None):
+    """根据实例和分组关系重建主机列表数据
+
+    Args:
+        ids (iterable): 需要刷新的实例ID，为None时全部重建
+    """
+    instances = Instance.objects.all()
+    rels = Group.hosts.through.objects.all()
+    projections = HostProjection.objects.all()
+    if ids is not None:
+        ids = list(ids)
+        instances = instances.filter(id__in=ids)
+        rels = rels.filter(host_id__in=ids)
+        projections = projections.filter(id__in=ids)
+    group_ids = defaultdict(list)
+    for host_id, group_id in rels.order_by('id').values_list('host_id', 'group_id'):
+        group_ids[host_id].append(group_id)
+    objects = [build_projection(x, group_ids[x.id]) for x in instances]
+    with transaction.atomic():
+        projections.delete()
+        HostProjection.objects.bulk_create(objects, batch_size=500)
+    return len(objects)
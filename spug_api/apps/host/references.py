@@ -0,0 +1,95 @@
+# Copyright: (c) OpenSpug Organization. https://github.com/openspug/spug
+# Copyright: (c) <spug.dev@gmail.com>
+# Released under the AGPL-3.0 License.
+from django.db import transaction
+from django.db.models import F
+from apps.host.models import HostReference
+from apps.app.models import Deploy
+from apps.schedule.models import Task
+from apps.monitor.models import Detection
+from apps.exec.models import ExecTemplate
+from collections import defaultdict
+import json
+
+# 引用来源: (模型, 保存主机ID列表的字段)
+SOURCES = {
+    'deploy': (Deploy, 'host_ids'),
+    'task': (Task, 'targets'),
+    'detection': (Detection, 'targets'),
+    'exec_template': (ExecTemplate, 'host_ids'),
+}
+MAX_BLOCKERS = 5  # 删除提示中最多列出的关联对象数
+
+
+def get_host_ids(source, obj):
+    """解析对象关联的主机ID，任务计划的local和非主机类监控的地址不属于主机引用"""
+    if source == 'detection' and obj.type not in ('3', '4'):
+        return set()
+    _, field = SOURCES[source]
+    values = json.loads(getattr(obj, field) or '[]')
+    return {int(x) for x in values if str(x).isdigit()}
+
+
+def sync_host_refs(source, obj):
+    """按对象当前保存的主机列表更新引用，对象保存后调用"""
+    host_ids = get_host_ids(source, obj)
+    refs = HostReference.objects.filter(source=source, source_id=obj.id)
+    exists = set(refs.values_list('host_id', flat=True))
+    with transaction.atomic():
+        if exists - host_ids:
+            refs.filter(host_id__in=exists - host_ids).delete()
+        HostReference.objects.bulk_create([
+            HostReference(source=source, source_id=obj.id, host_id=x) for x in host_ids - exists
+        ])
+
+
+def remove_host_refs(source, source_id):
+    HostReference.objects.filter(source=source, source_id=source_id).delete()
+
+
+def rebuild_host_refs():
+    """根据现有数据重建全部引用"""
+    objects = []
+    for source, (model, _) in SOURCES.items():
+        for obj in model.objects.all():
+            objects.extend(HostReference(source=source, source_id=obj.id, host_id=x) for x in get_host_ids(source, obj))
+    with transaction.atomic():
+        HostReference.objects.all().delete()
+        HostReference.objects.bulk_create(objects, batch_size=500)
+    return len(objects)
+
+
+def _get_labels(source, source_ids):
+    if source == 'deploy':
+        queryset = Deploy.objects.filter(id__in=source_ids).annotate(app_name=F('app__name'), env_name=F('env__name'))
+        return [f'应用【{x.app_name}】在【{x.env_name}】的发布配置' for x in queryset]
+    model, _ = SOURCES[source]
+    names = model.objects.filter(id__in=source_ids).values_list('name', flat=True)
+    if source == 'task':
+        return [f'任务计划中的任务【{x}】' for x in names]
+    if source == 'detection':
+        return [f'监控中心的任务【{x}】' for x in names]
+    return [f'执行模板【{x}】' for x in names]
+
+
+def get_host_blockers(host_ids):
+    """一次查出所有关联了这些主机的对象，返回用于提示的描述列表"""
+    refs = defaultdict(set)
+    queryset = HostReference.objects.filter(host_id__in=host_ids).values_list('source', 'source_id')
+    for source, source_id in queryset:
+        refs[source].add(source_id)
+    labels = []
+    for source in SOURCES:
+        if refs[source]:
+            labels.extend(_get_labels(source, refs[source]))
+    return labels
+
+
+def check_host_delete(host_ids):
+    """返回阻止删除这些主机的错误信息，没有关联时返回None"""
+    labels = get_host_blockers(host_ids)
+    if labels:
+        message = '、'.join(labels[:MAX_BLOCKERS])
+        if len(labels) > MAX_BLOCKERS:
+            message += f'等{len(labels)}项配置'
+        return f'{message}关联了该主机，请解除关联后再尝试删除该主机'
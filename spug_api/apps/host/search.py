@@ -0,0 +1,105 @@
+# Copyright: (c) OpenSpug Organization. https://github.com/openspug/spug
+# Copyright: (c) <spug.dev@gmail.com>
+# Released under the AGPL-3.0 License.
+from django.views.generic import View
+from django.db import connection, transaction
+from django.db.models import Case, When, Value, IntegerField
+from libs import json_response, JsonParser, Argument, auth
+from apps.host.models import AssetSearch, Instance, Disk, IP, CDN, Storage
+
+KINDS = {'instance': Instance, 'disk': Disk, 'ip': IP, 'cdn': CDN, 'storage': Storage}
+MIN_FTS_LENGTH = 3  # trigram分词至少需要3个字符，更短的关键字直接匹配索引表
+
+
+def join_keywords(*values):
+    return '|' + '|'.join(str(x) for x in values if x) + '|'
+
+
+def build_entry(kind, obj):
+    if kind == 'instance':
+        title, subtitle = obj.name or obj.instance_id, obj.instance_id
+        keywords = join_keywords(obj.instance_id, obj.name, obj.internal_ip, obj.public_ip)
+    elif kind == 'disk':
+        title, subtitle = obj.name, obj.disk_id
+        keywords = join_keywords(obj.disk_id, obj.name, obj.server_id)
+    elif kind == 'ip':
+        title, subtitle = obj.eip, obj.name
+        keywords = join_keywords(obj.eip, obj.name, obj.instance)
+    elif kind == 'cdn':
+        title, subtitle = obj.name, obj.domain
+        keywords = join_keywords(obj.name, obj.domain)
+    else:
+        title, subtitle = obj.name, obj.type
+        keywords = join_keywords(obj.name)
+    return AssetSearch(
+        kind=kind,
+        object_id=obj.id,
+        title=title or '',
+        subtitle=subtitle or '',
+        keywords=keywords,
+        owner_id=getattr(obj, 'created_by_id', None)
+    )
+
+
+def index_asset(kind, obj):
+    entry = build_entry(kind, obj)
+    with transaction.atomic():
+        AssetSearch.objects.filter(kind=kind, object_id=obj.id).delete()
+        entry.save()
+
+
+def remove_asset(kind, object_id):
+    AssetSearch.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def rebuild_search_index(*kinds):
+    """重建指定类型的索引，导入脚本直接写库后调用，未指定类型时全部重建"""
+    for kind in kinds or KINDS:
+        objects = [build_entry(kind, x) for x in KINDS[kind].objects.all()]
+        with transaction.atomic():
+            AssetSearch.objects.filter(kind=kind).delete()
+            AssetSearch.objects.bulk_create(objects, batch_size=500)
+
+
+def search_assets(keyword, kinds=None, user=None, offset=0, limit=20):
+    """按关键字搜索资产，完全匹配某个字段的排最前，其次是前缀匹配，最后是包含匹配
+
+    Returns:
+        tuple: (总数, 当前页的索引记录)
+    """
+    queryset = AssetSearch.objects.all()
+    if kinds:
+        queryset = queryset.filter(kind__in=kinds)
+    if user and not user.is_supper:
+        # 与各列表接口保持一致的数据范围（见filter_by_owner），没有创建人的资产owner_id为空，仅管理员可见
+        queryset = queryset.filter(owner_id=user.id)
+    if connection.vendor == 'sqlite' and len(keyword) >= MIN_FTS_LENGTH:
+        phrase = '"' + keyword.replace('"', '""') + '"'
+        where = 'asset_search.id IN (SELECT rowid FROM asset_search_fts WHERE asset_search_fts MATCH %s)'
+        queryset = queryset.extra(where=[where], params=[phrase])
+    else:
+        queryset = queryset.filter(keywords__icontains=keyword)
+    total = queryset.count()
+    queryset = queryset.annotate(rank=Case(
+        When(keywords__icontains=f'|{keyword}|', then=Value(0)),
+        When(keywords__icontains=f'|{keyword}', then=Value(1)),
+        default=Value(2),
+        output_field=IntegerField()
+    )).order_by('rank', 'title', 'id')
+    return total, list(queryset[offset:offset + limit])
+
+
+class SearchView(View):
+    @auth('host.host.view')
+    def get(self, request):
+        form, error = JsonParser(
+            Argument('q', handler=str.strip, filter=lambda x: x, help='请输入搜索内容'),
+            Argument('kind', required=False),
+            Argument('offset', type=int, default=0, filter=lambda x: x >= 0, help='参数错误'),
+            Argument('limit', type=int, default=20, filter=lambda x: 0 < x <= 100, help='参数错误'),
+        ).parse(request.GET)
+        if error is None:
+            kinds = [x for x in (form.kind or '').split(',') if x in KINDS]
+            total, entries = search_assets(form.q, kinds, request.user, form.offset, form.limit)
+            return json_response({'total': total, 'data': [x.to_view() for x in entries]})
+        return json_response(error=error)
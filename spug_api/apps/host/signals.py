@@ -0,0 +1,129 @@
+# Copyright: (c) OpenSpug Organization. https://github.com/openspug/spug
+# Copyright: (c) <spug.dev@gmail.com>
+# Released under the AGPL-3.0 License.
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+from apps.host.models import Host, Instance, ResourceCost, Disk, IP, Group
+from apps.host.changes import log_changes, group_host_key
+from apps.host.projection import refresh_host_projection
+from apps.host.references import SOURCES, sync_host_refs, remove_host_refs
+from apps.host.closure import rebuild_group_closure
+from apps.host.search import KINDS, index_asset, remove_asset
+from apps.account.utils import clear_host_perms_cache
+from apps.host.utils import bump_data_version
+
+CHANGE_TARGETS = {Instance: 'instance', Disk: 'disk', IP: 'ip'}
+REF_SOURCES = {model: source for source, (model, _) in SOURCES.items()}
+SEARCH_KINDS = {model: kind for kind, model in KINDS.items()}
+
+
+# 实例和费用数据变更后递增版本号，相关统计缓存随之失效
+@receiver([post_save, post_delete], sender=Instance)
+def instance_changed(sender, **kwargs):
+    bump_data_version('instance')
+
+
+@receiver([post_save, post_delete], sender=ResourceCost)
+def cost_changed(sender, **kwargs):
+    bump_data_version('cost')
+
+
+# 记录资产变更，供客户端增量同步
+@receiver(post_save, sender=Instance)
+@receiver(post_save, sender=Disk)
+@receiver(post_save, sender=IP)
+def asset_saved(sender, instance, created, **kwargs):
+    log_changes(CHANGE_TARGETS[sender], 'create' if created else 'update', [instance.id])
+    if sender is Instance:
+        refresh_host_projection([instance.id])
+
+
+@receiver(post_delete, sender=Instance)
+@receiver(post_delete, sender=Disk)
+@receiver(post_delete, sender=IP)
+def asset_deleted(sender, instance, **kwargs):
+    log_changes(CHANGE_TARGETS[sender], 'delete', [instance.id])
+    if sender is Instance:
+        refresh_host_projection([instance.id])
+
+
+@receiver(m2m_changed, sender=Group.hosts.through)
+def group_hosts_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # reverse为True时是从主机一侧修改，instance为主机，pk_set为分组ID
+    if action in ('post_add', 'post_remove') and pk_set:
+        if reverse:
+            keys = [group_host_key(x, instance.id) for x in pk_set]
+        else:
+            keys = [group_host_key(instance.id, x) for x in pk_set]
+        log_changes('group_host', 'create' if action == 'post_add' else 'delete', keys)
+        refresh_host_projection([instance.id] if reverse else pk_set)
+        clear_host_perms_cache()
+        bump_data_version('group')
+    elif action == 'pre_clear':
+        rels = sender.objects.filter(**{'host_id' if reverse else 'group_id': instance.id})
+        keys = [group_host_key(x.group_id, x.host_id) for x in rels]
+        instance._cleared_host_ids = {x.host_id for x in rels}
+        if keys:
+            log_changes('group_host', 'delete', keys)
+    elif action == 'post_clear':
+        refresh_host_projection(getattr(instance, '_cleared_host_ids', ()))
+        clear_host_perms_cache()
+        bump_data_version('group')
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, **kwargs):
+    rebuild_group_closure()
+    clear_host_perms_cache()
+    bump_data_version('group')
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # 删除分组时关联关系被级联删除，不会触发m2m_changed
+    instance._deleted_host_ids = list(instance.hosts.values_list('id', flat=True))
+    keys = [group_host_key(instance.id, x) for x in instance._deleted_host_ids]
+    if keys:
+        log_changes('group_host', 'delete', keys)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    refresh_host_projection(getattr(instance, '_deleted_host_ids', ()))
+    rebuild_group_closure()
+    clear_host_perms_cache()
+    bump_data_version('group')
+
+
+# 分组树中包含主机名称
+@receiver([post_save, post_delete], sender=Host)
+def host_changed(sender, **kwargs):
+    bump_data_version('group')
+
+
+# 维护主机引用，通过queryset.update()修改主机列表的地方需要手动调用sync_host_refs
+def host_refs_saved(sender, instance, **kwargs):
+    sync_host_refs(REF_SOURCES[sender], instance)
+
+
+def host_refs_deleted(sender, instance, **kwargs):
+    remove_host_refs(REF_SOURCES[sender], instance.id)
+
+
+for model in REF_SOURCES:
+    post_save.connect(host_refs_saved, sender=model)
+    post_delete.connect(host_refs_deleted, sender=model)
+
+
+# 维护资产搜索索引
+def search_asset_saved(sender, instance, **kwargs):
+    index_asset(SEARCH_KINDS[sender], instance)
+
+
+def search_asset_deleted(sender, instance, **kwargs):
+    remove_asset(SEARCH_KINDS[sender], instance.id)
+
+
+for model in SEARCH_KINDS:
+    post_save.connect(search_asset_saved, sender=model)
+    post_delete.connect(search_asset_deleted, sender=model)
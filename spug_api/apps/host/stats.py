@@ -0,0 +1,230 @@
+# Copyright: (c) OpenSpug Organization. https://github.com/openspug/spug
+# Copyright: (c) <spug.dev@gmail.com>
+# Released under the AGPL-3.0 License.
+from functools import partial
+from dateutil.relativedelta import relativedelta
+from django.db.models import Q, F, Case, When, Value, Count, CharField
+from apps.host.models import Instance
+from apps.host.cost import COST_CATEGORIES, get_cost_totals
+from apps.host.cube import get_cost_cube
+from apps.host.forecast import Z_SCORE, get_cost_model, forecast_instances
+from apps.host.utils import get_data_versions
+from libs.cache import cached
+import numpy as np
+import datetime
+
+# 费用数据由导入脚本写入，实例数据由同步和导入脚本写入，写入后对应的版本号递增
+cost_version = partial(get_data_versions, 'cost')
+dashboard_version = partial(get_data_versions, 'cost', 'instance')
+
+# 仪表盘相关的统计由定时任务在后台刷新，缓存失效后先返回旧数据
+STALE_TIMEOUT = 24 * 60 * 60
+
+
+# 超过该条数视为导出全部数据，不分页也不缓存
+MAX_PAGE_SIZE = 1000
+
+
+def build_cost_page(months, resource_type, product_type, search, sort_by, offset, limit):
+    # 在进程内的费用数据副本上完成过滤和排序
+    cube = get_cost_cube()
+    mask = cube.filter(months, resource_type, product_type, search)
+    rows = cube.sort(mask, sort_by)
+
+    # 获取总数
+    total = len(rows)
+
+    # 如果limit非常大（比如999999），则返回所有数据，否则进行正常分页
+    if limit <= MAX_PAGE_SIZE:
+        rows = rows[offset:offset + limit]
+
+    return {
+        'total': total,
+        'data': cube.to_views(rows)
+    }
+
+
+# 只缓存分页结果，导出全部数据时调用build_cost_page，避免把整份明细写入缓存
+@cached('cost_page', 10 * 60, cost_version)
+def get_cost_page(months, resource_type, product_type, search, sort_by, offset, limit):
+    return build_cost_page(months, resource_type, product_type, search, sort_by, offset, limit)
+
+
+@cached('cost_stats', 60 * 60, cost_version)
+def get_cost_stats(month):
+    cube = get_cost_cube()
+
+    # 按资源类型统计费用总额
+    type_stats = cube.group_by('type', cube.filter([month] if month else None))
+    stats_by_type = []
+    for resource_type in ['ECS实例', '云盘', '弹性IP']:
+        if resource_type in type_stats:
+            count, cents = type_stats[resource_type]
+            stats_by_type.append({
+                'type': resource_type,
+                'count': count,
+                'total_cost': round(cents / 100, 2)
+            })
+
+    # 按月份统计费用总额
+    month_stats = cube.group_by('month', cube.filter())
+    stats_by_month = [{
+        'month': month,
+        'total_cost': round(cents / 100, 2)
+    } for month, (_, cents) in month_stats.items()]
+
+    return {
+        'stats_by_type': stats_by_type,
+        'stats_by_month': stats_by_month
+    }
+
+
+# 服务器配置分类，(名称, CPU核数, 内存上限GB)，不满足任何一项的归为"其他"
+CONFIG_CLASSES = (
+    ('2核4G', 2, 4),
+    ('2核8G', 2, 8),
+    ('4核8G', 4, 8),
+    ('8核16G', 8, 16),
+    ('16核32G', 16, 32),
+)
+
+
+def get_instance_stats():
+    """操作系统分布和服务器配置分布，在数据库中分组计数，不加载实例数据"""
+    os_name = Case(
+        When(Q(os_name__isnull=True) | Q(os_name=''), then=Value('其他')),
+        default=F('os_name'),
+        output_field=CharField()
+    )
+    os_rows = Instance.objects.annotate(label=os_name).values('label').annotate(value=Count('id')).order_by('-value')
+
+    config = Case(
+        *[When(cpu_count=cpu, memory_capacity_in_gb__lte=memory, then=Value(name)) for name, cpu, memory in CONFIG_CLASSES],
+        default=Value('其他'),
+        output_field=CharField()
+    )
+    config_rows = Instance.objects.annotate(label=config).values('label').annotate(value=Count('id')).order_by('-value')
+
+    return {
+        'os_distribution': [{'name': x['label'], 'value': x['value']} for x in os_rows],
+        'config_distribution': [{'name': x['label'], 'value': x['value']} for x in config_rows]
+    }
+
+
+def _fill_trend(response_data, values, std, floor, digits=0):
+    """按费用类型写入费用和置信区间，floor为区间下限（已发生的费用）"""
+    def to_list(x):
+        return np.round(x, digits).tolist() if digits else np.rint(x).astype(int).tolist()
+
+    response_data['lower'], response_data['upper'] = {}, {}
+    lower = np.maximum(values - Z_SCORE * std, floor)
+    upper = values + Z_SCORE * std
+    for idx, (key, _) in enumerate(COST_CATEGORIES):
+        response_data[key] = to_list(values[idx])
+        response_data['lower'][key] = to_list(lower[idx])
+        response_data['upper'][key] = to_list(upper[idx])
+    return response_data
+
+
+@cached('cost_trend_monthly', 60 * 60, cost_version, STALE_TIMEOUT)
+def get_monthly_cost_trend(year):
+    # 已有数据的月份使用实际费用，之后的月份使用模型预测值
+    values, std, predicted = get_cost_model().project([int(year) * 12 + i for i in range(12)])
+    response_data = {'year': year, 'predicted': predicted.tolist()}
+    return _fill_trend(response_data, values, std, 0, 2)
+
+
+@cached('cost_trend_yearly', 24 * 60 * 60, cost_version, STALE_TIMEOUT)
+def get_yearly_cost_trend():
+    # 获取最近几年的数据，包括当前年份和未来2年的预测
+    current_year = datetime.datetime.now().year
+    start_year = 2021  # 从2021年开始
+    end_year = current_year + 2
+    years = list(range(start_year, end_year + 1))
+
+    # 逐月取实际费用或预测值，再按年累计，各月的预测误差视为相互独立
+    values, std, predicted = get_cost_model().project([y * 12 + i for y in years for i in range(12)])
+    shape = (len(COST_CATEGORIES), len(years), 12)
+    actual = np.where(predicted, 0, values).reshape(shape).sum(axis=2)
+    yearly = values.reshape(shape).sum(axis=2)
+    deviation = np.sqrt((std ** 2).reshape(shape).sum(axis=2))
+
+    response_data = {
+        'years': [str(y) for y in years],
+        'predicted': predicted.reshape(len(years), 12).any(axis=1).tolist()
+    }
+    return _fill_trend(response_data, yearly, deviation, actual)
+
+
+@cached('instance_forecast', 60 * 60, cost_version)
+def get_instance_forecast(steps, offset, limit):
+    """一次批量拟合所有实例，返回之后steps个月的预测费用，按预测总费用倒序分页"""
+    instance_ids, months, values, std = forecast_instances(steps)
+    lower = np.round(np.maximum(values - Z_SCORE * std, 0), 2)
+    upper = np.round(values + Z_SCORE * std, 2)
+    values = np.round(values, 2)
+    order = np.argsort(-values.sum(axis=1), kind='stable')[offset:offset + limit]
+    return {
+        'months': months,
+        'total': len(instance_ids),
+        'data': [{
+            'instance_id': instance_ids[idx],
+            'values': values[idx].tolist(),
+            'lower': lower[idx].tolist(),
+            'upper': upper[idx].tolist(),
+        } for idx in order.tolist()]
+    }
+
+
+@cached('dashboard_summary', 60 * 60, dashboard_version, STALE_TIMEOUT)
+def get_dashboard_summary():
+    # 计算主机总数
+    host_count = Instance.objects.count()
+
+    # 计算在线主机数量
+    online_count = Instance.objects.filter(status='Running').count()
+
+    # 计算30天内即将到期的主机数量
+    now = datetime.datetime.now()
+    thirty_days_later = now + relativedelta(days=30)
+    now_str = now.strftime('%Y-%m-%d')
+    thirty_days_later_str = thirty_days_later.strftime('%Y-%m-%d')
+
+    expiring_count = Instance.objects.filter(
+        expire_time__gte=now_str,
+        expire_time__lte=thirty_days_later_str
+    ).count()
+
+    # 计算上个月的支出总额
+    last_month = now - relativedelta(months=1)
+    last_month_str = last_month.strftime('%Y-%m')
+
+    # 计算当前年度到目前为止的累计费用
+    current_year = now.year
+    current_month = now.month
+    totals = get_cost_totals(month__gte=f'{current_year}-01', month__lte=f'{current_year}-{current_month:02d}')
+    yearly_costs = {}
+    for key, resource_type in COST_CATEGORIES:
+        yearly_costs[key] = sum(total for (_, t), total in totals.items() if t == resource_type)
+
+    # 计算上个月总支出
+    monthly_expense = sum(get_cost_totals(month=last_month_str).values())
+
+    return {
+        'hostCount': host_count,
+        'onlineCount': online_count,
+        'expiringCount': expiring_count,
+        'monthlyExpense': round(monthly_expense),
+        'yearlyCompute': round(yearly_costs['compute']),
+        'yearlyStorage': round(yearly_costs['storage']),
+        'yearlyNetwork': round(yearly_costs['network'])
+    }
+
+
+def refresh_dashboard_stats():
+    """重新计算仪表盘和费用趋势（最近3年）并写入缓存"""
+    get_dashboard_summary.refresh()
+    get_yearly_cost_trend.refresh()
+    current_year = datetime.datetime.now().year
+    for year in range(current_year - 2, current_year + 1):
+        get_monthly_cost_trend.refresh(str(year))
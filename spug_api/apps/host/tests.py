@@ -0,0 +1,82 @@
+# Copyright: (c) OpenSpug Organization. https://github.com/openspug/spug
+# Copyright: (c) <spug.dev@gmail.com>
+# Released under the AGPL-3.0 License.
+from django.test import TestCase, RequestFactory
+from apps.account.models import User
+from apps.host.models import Disk, CDN, IP, Instance, Storage
+from apps.host.views import DiskView, StorageView, CDNView, IPView, InstanceView, ResourceCostStatsView
+from apps.host.export import get_queryset
+from apps.host.search import search_assets
+import json
+
+
+class AssetScopeTest(TestCase):
+    """非管理员在列表、导出和搜索中都只能看到自己创建的资产"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', nickname='admin', is_supper=True)
+        cls.alice = User.objects.create(username='alice', nickname='alice')
+        cls.bob = User.objects.create(username='bob', nickname='bob')
+        CDN.objects.create(name='scope-cdn-alice', domain='a.example.com', type='web', status='on',
+                           created_by=cls.alice)
+        CDN.objects.create(name='scope-cdn-bob', domain='b.example.com', type='web', status='on',
+                           created_by=cls.bob)
+        Storage.objects.create(name='scope-storage-bob', type='S3', capacity=100, status='online',
+                               created_by=cls.bob)
+        Disk.objects.create(name='scope-disk', disk_id='d-1', status='inUse')
+        IP.objects.create(eip='10.0.0.1', name='scope-ip-alice')
+        Instance.objects.create(instance_id='i-1', name='scope-instance')
+
+    def list(self, view, user):
+        request = RequestFactory().get('/')
+        request.user = user
+        response = json.loads(view.as_view()(request).content)
+        self.assertEqual(response['error'], '')
+        return sorted(x['name'] for x in response['data'])
+
+    def export(self, model, user):
+        request = RequestFactory().get('/')
+        request.user = user
+        return sorted(get_queryset(request, model).values_list('name', flat=True))
+
+    def search(self, user):
+        _, entries = search_assets('scope', user=user, limit=100)
+        return sorted(x.title for x in entries)
+
+    def test_admin_sees_all(self):
+        self.assertEqual(self.list(CDNView, self.admin), ['scope-cdn-alice', 'scope-cdn-bob'])
+        self.assertEqual(self.list(DiskView, self.admin), ['scope-disk'])
+        self.assertEqual(self.export(IP, self.admin), ['scope-ip-alice'])
+        self.assertEqual(len(self.search(self.admin)), 6)
+
+    def test_user_sees_own_rows(self):
+        self.assertEqual(self.list(CDNView, self.alice), ['scope-cdn-alice'])
+        self.assertEqual(self.list(StorageView, self.alice), [])
+        self.assertEqual(self.export(CDN, self.alice), ['scope-cdn-alice'])
+        self.assertEqual(self.export(Storage, self.alice), [])
+        self.assertEqual(self.search(self.alice), ['scope-cdn-alice'])
+        self.assertEqual(self.search(self.bob), ['scope-cdn-bob', 'scope-storage-bob'])
+
+    def test_imported_assets_admin_only(self):
+        # 云平台导入的资产没有创建人，名称中包含用户名也不可见
+        for view, model in ((DiskView, Disk), (IPView, IP), (InstanceView, Instance)):
+            self.assertEqual(self.list(view, self.alice), [])
+            self.assertEqual(self.export(model, self.alice), [])
+
+
+class ForceRefreshTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', nickname='admin', is_supper=True)
+        cls.user = User.objects.create(username='alice', nickname='alice')
+
+    def get(self, user, path):
+        request = RequestFactory().get(path)
+        request.user = user
+        return json.loads(ResourceCostStatsView.as_view()(request).content)
+
+    def test_force_refresh_admin_only(self):
+        self.assertEqual(self.get(self.user, '/?force=1')['error'], '仅管理员可强制刷新缓存')
+        self.assertEqual(self.get(self.user, '/')['error'], '')
+        self.assertEqual(self.get(self.admin, '/?force=1')['error'], '')
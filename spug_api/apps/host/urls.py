@@ -7,6 +7,9 @@ from apps.host.views import *
 from apps.host.group import GroupView
 from apps.host.extend import ExtendView
 from apps.host.add import get_regions, cloud_import
+from apps.host.export import export_data
+from apps.host.changes import ChangeView
+from apps.host.search import SearchView
 
 urlpatterns = [
     path('', HostView.as_view()),
@@ -17,13 +20,19 @@ urlpatterns = [
     path('cdn/', CDNView.as_view()),
     path('ip/', IPView.as_view()),
     path('instance/', InstanceView.as_view()),
+    path('instance/detail/', InstanceDetailView.as_view()),
     path('import/', post_import),
     path('import/cloud/', cloud_import),
     path('import/region/', get_regions),
     path('parse/', post_parse),
+    path('export/', export_data),
+    path('changes/', ChangeView.as_view()),
+    path('search/', SearchView.as_view()),
     path('valid/', batch_valid),
     path('cost/', ResourceCostView.as_view()),
     path('cost/stats/', ResourceCostStatsView.as_view()),
     path('cost/trend/', CostTrendView.as_view()),
+    path('cost/anomalies/', CostAnomalyView.as_view()),
+    path('cost/forecast/', CostForecastView.as_view()),
     path('stats/', InstanceStatsView.as_view()),
 ]
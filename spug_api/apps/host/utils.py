@@ -6,7 +6,9 @@ from libs.helper import make_ali_request, make_tencent_request
 from libs.ssh import SSH, AuthenticationException
 from libs.utils import AttrDict, human_datetime
 from libs.validators import ip_validator
-from apps.host.models import HostExtend
+from django.db import transaction
+from django.db.models import F
+from apps.host.models import HostExtend, DataVersion
 from apps.setting.utils import AppSetting
 from collections import defaultdict
 from datetime import datetime, timezone
@@ -17,6 +19,36 @@ import math
 import os
 
 
+def get_data_version(key):
+    version = DataVersion.objects.filter(key=key).values_list('version', flat=True).first()
+    return version or 0
+
+
+# 多个数据版本号拼接成一个字符串，用作缓存键的一部分
+def get_data_versions(*keys):
+    versions = dict(DataVersion.objects.filter(key__in=keys).values_list('key', 'version'))
+    return '.'.join(str(versions.get(x, 0)) for x in keys)
+
+
+def bump_data_version(key):
+    """递增数据版本号，在事务提交后执行，避免并发请求用提交前的数据生成新版本的缓存"""
+    def bump():
+        DataVersion.objects.get_or_create(key=key)
+        DataVersion.objects.filter(key=key).update(version=F('version') + 1)
+
+    transaction.on_commit(bump)
+
+
+def filter_by_owner(queryset, user):
+    """资产的数据范围：管理员可见全部；其他用户只能看到自己创建的记录，
+    从云平台导入的资产（实例、磁盘、IP）没有创建人，仅管理员可见"""
+    if user.is_supper:
+        return queryset
+    if any(x.name == 'created_by' for x in queryset.model._meta.fields):
+        return queryset.filter(created_by=user)
+    return queryset.none()
+
+
 def check_os_type(os_name):
     os_name = os_name.lower()
     types = ('centos', 'coreos', 'debian', 'suse', 'ubuntu', 'windows', 'freebsd', 'tencent', 'alibaba', 'fedora')
@@ -2,17 +2,17 @@
 # Copyright: (c) <spug.dev@gmail.com>
 # Released under the AGPL-3.0 License.
 from django.views.generic import View
-from django.db.models import F, Q, Sum
 from django.http.response import HttpResponseBadRequest
 from libs import json_response, JsonParser, Argument, AttrDict, auth
+from libs.pagination import Pager
 from apps.setting.utils import AppSetting
 from apps.account.utils import get_host_perms
-from apps.host.models import Host, Group, Disk, Storage, CDN, IP, ResourceCost, Instance
-from apps.host.utils import batch_sync_host, _sync_host_extend, check_os_type
-from apps.exec.models import ExecTemplate
-from apps.app.models import Deploy
-from apps.schedule.models import Task
-from apps.monitor.models import Detection
+from apps.host.models import Host, Group, Disk, Storage, CDN, IP, ResourceCost, Instance, CostAnomaly, \
+    HostProjection
+from apps.host.stats import get_cost_page, get_cost_stats, get_instance_stats, get_monthly_cost_trend, \
+    get_yearly_cost_trend, get_dashboard_summary, get_instance_forecast, build_cost_page, MAX_PAGE_SIZE
+from apps.host.utils import batch_sync_host, _sync_host_extend, check_os_type, filter_by_owner
+from apps.host.references import check_host_delete
 from libs.ssh import SSH, AuthenticationException
 from paramiko.ssh_exception import BadAuthenticationType
 from openpyxl import load_workbook
@@ -27,45 +27,22 @@ import json
 from django.db import models
 from django.core.cache import cache
 from dateutil.relativedelta import relativedelta
+from datetime import date
 
 
 class HostView(View):
+    pager = Pager(
+        filters=('status', 'os_name', 'os_type'),
+        sorts=('name', 'hostname', 'status', 'expired_time', 'cpu', 'memory'),
+        search_fields=('name', 'instance_id', 'hostname', 'private_ip_address', 'public_ip_address'),
+    )
+
     def get(self, request):
-        # 使用Instance模型替代Host模型
-        instances = Instance.objects.all()
+        # 主机列表直接读取由实例和分组关系生成的物化数据
+        hosts = HostProjection.objects.all()
         if not request.user.is_supper:
-            # 保持权限检查逻辑，但使用Instance
-            hosts_with_perm = get_host_perms(request.user)
-            instances = instances.filter(id__in=hosts_with_perm)
-        
-        # 转换实例数据为服务器格式
-        hosts = {}
-        for x in instances:
-            hosts[x.id] = {
-                'id': x.id,
-                'name': x.name,
-                'hostname': x.internal_ip or x.public_ip or '',
-                'port': 22,  # 默认SSH端口
-                'username': 'root',  # 默认用户名
-                'desc': x.desc,
-                'instance_id': x.instance_id,
-                'cpu': x.cpu_count,
-                'memory': x.memory_capacity_in_gb,
-                'os_name': x.os_name or '',
-                'os_type': 'linux' if x.os_name and 'linux' in x.os_name.lower() else ('windows' if x.os_name and 'windows' in x.os_name.lower() else ''),
-                'private_ip_address': [x.internal_ip] if x.internal_ip else [],
-                'public_ip_address': [x.public_ip] if x.public_ip else [],
-                'expired_time': x.expire_time,
-                'is_verified': x.status == 'Running',
-                'status': x.status or 'Stopped',  # 添加status字段
-                'group_ids': []
-            }
-        
-        # 保持原有的分组关联逻辑
-        for rel in Group.hosts.through.objects.filter(host_id__in=hosts.keys()):
-            hosts[rel.host_id]['group_ids'].append(rel.group_id)
-            
-        return json_response(list(hosts.values()))
+            hosts = hosts.filter(id__in=get_host_perms(request.user))
+        return self.pager.response(request, hosts, lambda items: [x.to_view() for x in items])
 
     @auth('host.host.add|host.host.edit')
     def post(self, request):
@@ -96,27 +73,6 @@ class HostView(View):
                 instance.desc = form.get('desc')
                 instance.status = 'Running'  # 标记为已验证
                 instance.save()
-                
-                # 获取完整的实例数据
-                result = {
-                    'id': instance.id,
-                    'name': instance.name,
-                    'hostname': instance.internal_ip or instance.public_ip or '',
-                    'port': form.port,  # 保存端口
-                    'username': form.username,  # 保存用户名
-                    'desc': instance.desc,
-                    'instance_id': instance.instance_id,
-                    'cpu': instance.cpu_count,
-                    'memory': instance.memory_capacity_in_gb,
-                    'os_name': instance.os_name or '',
-                    'os_type': 'linux' if instance.os_name and 'linux' in instance.os_name.lower() else ('windows' if instance.os_name and 'windows' in instance.os_name.lower() else ''),
-                    'private_ip_address': [instance.internal_ip] if instance.internal_ip else [],
-                    'public_ip_address': [instance.public_ip] if instance.public_ip else [],
-                    'expired_time': instance.expire_time,
-                    'is_verified': instance.status == 'Running',
-                    'status': instance.status or 'Stopped',  # 添加status字段
-                    'group_ids': group_ids
-                }
             else:
                 # 创建新实例
                 instance = Instance.objects.create(
@@ -126,27 +82,6 @@ class HostView(View):
                     desc=form.get('desc'),
                     created_by=request.user
                 )
-                
-                # 获取完整的实例数据
-                result = {
-                    'id': instance.id,
-                    'name': instance.name,
-                    'hostname': instance.internal_ip or '',
-                    'port': form.port,
-                    'username': form.username,
-                    'desc': instance.desc,
-                    'instance_id': instance.instance_id,
-                    'cpu': instance.cpu_count,
-                    'memory': instance.memory_capacity_in_gb,
-                    'os_name': instance.os_name or '',
-                    'os_type': 'linux',  # 默认类型
-                    'private_ip_address': [instance.internal_ip] if instance.internal_ip else [],
-                    'public_ip_address': [instance.public_ip] if instance.public_ip else [],
-                    'expired_time': instance.expire_time,
-                    'is_verified': instance.status == 'Running',
-                    'status': instance.status or 'Stopped',  # 添加status字段
-                    'group_ids': group_ids
-                }
             
             # 更新分组关系 - 使用现有的Group和Host的关联关系
             # 需要创建一个可用的Host记录来维持分组关系，或修改分组模型
@@ -156,6 +91,9 @@ class HostView(View):
                 for group in groups:
                     group.hosts.add(instance.id)
             
+            # 获取完整的实例数据，主机列表数据已在保存时由信号刷新
+            result = HostProjection.objects.get(pk=instance.id).to_view()
+            result.update(port=form.port, username=form.username)
             return json_response(result)
         return json_response(error=error)
 
@@ -238,22 +176,9 @@ class HostView(View):
             else:
                 return json_response(error='参数错误')
                 
-            for host_id in host_ids:
-                regex = fr'[^0-9]{host_id}[^0-9]'
-                deploy = Deploy.objects.filter(host_ids__regex=regex) \
-                    .annotate(app_name=F('app__name'), env_name=F('env__name')).first()
-                if deploy:
-                    return json_response(error=f'应用【{deploy.app_name}】在【{deploy.env_name}】的发布配置关联了该主机，请解除关联后再尝试删除该主机')
-                task = Task.objects.filter(targets__regex=regex).first()
-                if task:
-                    return json_response(error=f'任务计划中的任务【{task.name}】关联了该主机，请解除关联后再尝试删除该主机')
-                detection = Detection.objects.filter(type__in=('3', '4'), targets__regex=regex).first()
-                if detection:
-                    return json_response(error=f'监控中心的任务【{detection.name}】关联了该主机，请解除关联后再尝试删除该主机')
-                tpl = ExecTemplate.objects.filter(host_ids__regex=regex).first()
-                if tpl:
-                    return json_response(error=f'执行模板【{tpl.name}】关联了该主机，请解除关联后再尝试删除该主机')
-                    
+            error = check_host_delete(host_ids)
+            if error:
+                return json_response(error=error)
             # 删除实例而不是主机
             Instance.objects.filter(id__in=host_ids).delete()
         return json_response(error=error)
@@ -347,7 +272,7 @@ def _do_host_verify(form):
     password = form.pop('password')
     if form.pkey:
         try:
-            with SSH(form.hostname, form.port, form.username, form.pkey) as ssh:
+            with SSH(form.hostname, form.port, form.username, form.pkey, pooled=False) as ssh:
                 ssh.ping()
             return True
         except BadAuthenticationType:
@@ -370,7 +295,7 @@ def _do_host_verify(form):
             raise Exception('连接主机超时，请检查网络')
 
     try:
-        with SSH(form.hostname, form.port, form.username, private_key) as ssh:
+        with SSH(form.hostname, form.port, form.username, private_key, pooled=False) as ssh:
             ssh.ping()
     except BadAuthenticationType:
         raise Exception('该主机不支持密钥认证，请参考官方文档，错误代码：E01')
@@ -385,16 +310,17 @@ def _do_host_verify(form):
 
 # 磁盘视图
 class DiskView(View):
+    pager = Pager(
+        filters=('status', 'storage_type', 'server_id'),
+        sorts=('name', 'size_in_gb', 'status', 'create_time', 'expire_time'),
+        search_fields=('name', 'disk_id', 'server_id'),
+    )
+
     def get(self, request):
-        # 检查是否有强制刷新参数
-        force_refresh = request.GET.get('force', '0') == '1'
-        
         # 从数据库获取磁盘数据
-        disks = Disk.objects.all()
-        if not request.user.is_supper:
-            disks = disks.filter(created_by=request.user)
+        disks = filter_by_owner(Disk.objects.all(), request.user)
         
-        return json_response([x.to_view() for x in disks])
+        return self.pager.response(request, disks, lambda items: [x.to_view() for x in items])
 
     @auth('host.disk.add|host.disk.edit')
     def post(self, request):
@@ -417,7 +343,7 @@ class DiskView(View):
                     return json_response(error='未找到指定磁盘')
                 disk.update_by_dict(form)
             else:
-                Disk.objects.create(created_by=request.user, **form)
+                Disk.objects.create(**form)
             return json_response()
         return json_response(error=error)
 
@@ -433,16 +359,17 @@ class DiskView(View):
 
 # 存储视图
 class StorageView(View):
+    pager = Pager(
+        filters=('type', 'status'),
+        sorts=('name', 'capacity', 'usage', 'created_at'),
+        search_fields=('name',),
+    )
+
     def get(self, request):
-        # 检查是否有强制刷新参数
-        force_refresh = request.GET.get('force', '0') == '1'
-        
         # 从数据库获取存储数据
-        storages = Storage.objects.all()
-        if not request.user.is_supper:
-            storages = storages.filter(created_by=request.user)
+        storages = filter_by_owner(Storage.objects.all(), request.user)
         
-        return json_response([x.to_view() for x in storages])
+        return self.pager.response(request, storages, lambda items: [x.to_view() for x in items])
 
     @auth('host.storage.add|host.storage.edit')
     def post(self, request):
@@ -478,16 +405,17 @@ class StorageView(View):
 
 # CDN视图
 class CDNView(View):
+    pager = Pager(
+        filters=('type', 'status'),
+        sorts=('name', 'domain', 'bandwidth', 'created_at'),
+        search_fields=('name', 'domain'),
+    )
+
     def get(self, request):
-        # 检查是否有强制刷新参数
-        force_refresh = request.GET.get('force', '0') == '1'
-        
         # 从数据库获取CDN数据
-        cdns = CDN.objects.all()
-        if not request.user.is_supper:
-            cdns = cdns.filter(created_by=request.user)
+        cdns = filter_by_owner(CDN.objects.all(), request.user)
         
-        return json_response([x.to_view() for x in cdns])
+        return self.pager.response(request, cdns, lambda items: [x.to_view() for x in items])
 
     @auth('host.cdn.add|host.cdn.edit')
     def post(self, request):
@@ -523,16 +451,17 @@ class CDNView(View):
 
 # IP地址视图
 class IPView(View):
+    pager = Pager(
+        filters=('status', 'instance', 'paymentTiming', 'billingMethod'),
+        sorts=('eip', 'name', 'status', 'createTime', 'expireTime'),
+        search_fields=('eip', 'name', 'instance'),
+    )
+
     def get(self, request):
-        # 检查是否有强制刷新参数
-        force_refresh = request.GET.get('force', '0') == '1'
-        
         # 从数据库获取IP数据
-        ips = IP.objects.all()
-        if not request.user.is_supper:
-            ips = ips.filter(name__contains=request.user.username)
+        ips = filter_by_owner(IP.objects.all(), request.user)
         
-        return json_response([x.to_view() for x in ips])
+        return self.pager.response(request, ips, lambda items: [x.to_view() for x in items])
 
     @auth('host.ip.add|host.ip.edit')
     def post(self, request):
@@ -570,14 +499,18 @@ class IPView(View):
 
 # 实例视图
 class InstanceView(View):
+    pager = Pager(
+        filters=('status', 'os_name', 'zone_name', 'payment_timing'),
+        sorts=('name', 'instance_id', 'internal_ip', 'status', 'create_time', 'expire_time', 'cpu_count',
+               'memory_capacity_in_gb'),
+        search_fields=('name', 'instance_id', 'internal_ip', 'public_ip'),
+    )
+
     def get(self, request):
-        # 检查是否有强制刷新参数
-        force_refresh = request.GET.get('force', '0') == '1'
-        
         # 从数据库获取实例数据
-        instances = Instance.objects.all()
-        
-        return json_response([x.to_view() for x in instances])
+        instances = filter_by_owner(Instance.objects.all(), request.user)
+
+        return self.pager.response(request, instances, lambda items: [x.to_view() for x in items])
 
     @auth('host.instance.add|host.instance.edit')
     def post(self, request):
@@ -621,9 +554,43 @@ class InstanceView(View):
         return json_response(error=error)
 
 
+# 实例详情，包括挂载的磁盘、绑定的弹性IP和最近几个月的费用，每项都是一次索引查询
+class InstanceDetailView(View):
+    def get(self, request):
+        form, error = JsonParser(
+            Argument('id', type=int, help='请指定实例ID'),
+            Argument('months', type=int, default=6, filter=lambda x: 0 < x <= 36, help='参数错误'),
+        ).parse(request.GET)
+        if error is None:
+            instance = Instance.objects.filter(pk=form.id).first()
+            if not instance:
+                return json_response(error='未找到指定实例')
+            disks = list(Disk.objects.filter(server_id=instance.instance_id))
+            ips = list(IP.objects.filter(instance=instance.instance_id))
+
+            # 云盘费用记录的instance_id为磁盘ID；弹性IP费用记录的instance_id为计费短ID（ip-xxx），
+            # IP表只保存地址和绑定实例，无法关联，因此费用中不包含弹性IP，通过excluded_costs告知调用方
+            start = (date.today().replace(day=1) - relativedelta(months=form.months - 1)).strftime('%Y-%m')
+            resource_ids = [instance.instance_id] + [x.disk_id for x in disks if x.disk_id]
+            costs = ResourceCost.objects.filter(instance_id__in=resource_ids, month__gte=start).order_by('month')
+            monthly = {}
+            for item in costs:
+                monthly[item.month] = monthly.get(item.month, 0) + item.price_cents
+            return json_response({
+                'instance': instance.to_view(),
+                'disks': [x.to_view() for x in disks],
+                'ips': [x.to_view() for x in ips],
+                'costs': [x.to_view() for x in costs],
+                'monthly_costs': [{'month': k, 'price': v / 100} for k, v in monthly.items()],
+                'excluded_costs': ['弹性IP'] if ips else [],
+            })
+        return json_response(error=error)
+
+
 # 资源费用API视图
 class ResourceCostView(View):
     def get(self, request):
+        """force=1强制刷新缓存，仅管理员可用"""
         resource_type = request.GET.get('resource_type', '')
         month = request.GET.get('month', '')
         product_type = request.GET.get('product_type', '')
@@ -634,533 +601,109 @@ class ResourceCostView(View):
         start_date = request.GET.get('start_date', '')
         end_date = request.GET.get('end_date', '')
         
-        # 生成缓存键，包含所有查询参数
-        cache_key = f"resource_costs_{resource_type}_{month}_{product_type}_{limit}_{offset}_{sort_by}_{search}_{start_date}_{end_date}"
-        
-        # 尝试从缓存获取数据
-        cached_data = cache.get(cache_key)
-        if cached_data and not request.GET.get('force', '0') == '1':
-            print(f"从缓存返回资源费用数据: {cache_key}")
-            return json_response(cached_data)
-            
-        # 构建查询条件
-        filters = {}
-        if resource_type:
-            filters['resource_type'] = resource_type
+        # 构建月份过滤条件
+        months = None
         if month:
-            filters['month'] = month
-        if product_type:
-            filters['product_type'] = product_type
-            
-        # 添加自定义日期范围
-        if start_date and end_date and not month:
-            start_month = start_date[:7]  # 提取YYYY-MM部分
-            end_month = end_date[:7]      # 提取YYYY-MM部分
-            # 如果起始月份和结束月份相同，就直接用month过滤
-            if start_month == end_month:
-                filters['month'] = start_month
-            else:
-                # 获取日期范围内的所有月份
-                import datetime
-                
-                start_year, start_month_num = map(int, start_month.split('-'))
-                end_year, end_month_num = map(int, end_month.split('-'))
-                
-                months = []
-                # 循环生成所有月份
-                for year in range(start_year, end_year + 1):
-                    for month_num in range(1, 13):
-                        # 跳过范围外的月份
-                        if year == start_year and month_num < start_month_num:
-                            continue
-                        if year == end_year and month_num > end_month_num:
-                            continue
-                        # 添加月份
-                        months.append(f"{year}-{month_num:02d}")
-                
-                # 使用__in查询包含所有月份
-                filters['month__in'] = months
-            
-        # 获取数据并去重
-        queryset = ResourceCost.objects.filter(**filters)
-        
-        # 添加搜索条件
-        if search:
-            queryset = queryset.filter(
-                models.Q(instance_id__icontains=search) | 
-                models.Q(instance_name__icontains=search)
-            )
-            
-        queryset = queryset.values('instance_id', 'month') \
-            .annotate(
-                max_id=models.Max('id'),
-                latest_finance_price=models.Max('finance_price')
-            )
-        
-        # 获取完整记录
-        ids = [item['max_id'] for item in queryset]
-        queryset = ResourceCost.objects.filter(id__in=ids)
-        
-        # 添加排序
-        if 'finance_price' in sort_by:
-            # SQLite不支持CAST AS DECIMAL，使用CAST AS REAL
-            sort_by = f"-finance_price" if sort_by.startswith('-') else "finance_price"
-            queryset = queryset.extra(
-                select={'finance_price_float': 'CAST(REPLACE(REPLACE(finance_price, "¥", ""), ",", "") AS REAL)'}) \
-                .order_by(sort_by.replace('finance_price', 'finance_price_float'))
-        else:
-            queryset = queryset.order_by(sort_by)
-            
-        # 获取总数
-        total = queryset.count()
-        
-        # 如果limit非常大（比如999999），则返回所有数据
-        if limit > 1000:
-            results = queryset.all()
-        else:
-            # 否则进行正常分页
-            results = queryset[offset:offset + limit]
-        
-        # 获取上个月数据用于计算环比
-        all_months = ResourceCost.objects.values_list('month', flat=True).distinct().order_by('month')
-        all_months = list(all_months)
-        month_map = {m: idx for idx, m in enumerate(all_months)}
-        
-        # 计算每个资源每个月的环比变化
-        change_map = {}
-        for item in results:
-            # 获取上个月
-            current_idx = month_map.get(item.month)
-            if current_idx is not None and current_idx > 0:
-                prev_month = all_months[current_idx - 1]
-                # 查找同一资源上个月的数据
-                prev_record = ResourceCost.objects.filter(
-                    instance_id=item.instance_id,
-                    resource_type=item.resource_type,
-                    month=prev_month
-                ).first()
-                
-                if prev_record:
-                    # 计算环比变化
-                    current_price = float(str(item.finance_price).replace('¥', '').replace(',', ''))
-                    prev_price = float(str(prev_record.finance_price).replace('¥', '').replace(',', ''))
-                    if prev_price > 0:
-                        change = round(((current_price - prev_price) / prev_price) * 100, 2)
-                    else:
-                        change = 100 if current_price > 0 else 0
-                    change_map[(item.instance_id, item.month)] = change
-        
-        # 转换为字典格式
-        data = []
-        for item in results:
-            # 获取环比变化
-            change = change_map.get((item.instance_id, item.month), 0)
-            
-            data.append({
-                'id': item.id,
-                'month': item.month,
-                'instance_id': item.instance_id,
-                'instance_name': item.instance_name or item.instance_id,
-                'resource_type': item.resource_type,
-                'product_type': item.product_type,
-                'finance_price': str(item.finance_price).replace('¥', '').replace(',', ''),
-                'change': change,
-                'created_at': item.created_at
-            })
-        
-        # 构建响应数据
-        response_data = {
-            'total': total,
-            'data': data
-        }
-        
-        # 将结果保存到缓存（设置5分钟过期）
-        cache.set(cache_key, response_data, 300)  # 缓存5分钟
-        
-        # 返回结果
-        return json_response(response_data)
+            months = [month]
+        elif start_date and end_date:
+            # 获取日期范围内的所有月份
+            start_year, start_month_num = map(int, start_date[:7].split('-'))
+            end_year, end_month_num = map(int, end_date[:7].split('-'))
+            months = []
+            for year in range(start_year, end_year + 1):
+                for month_num in range(1, 13):
+                    # 跳过范围外的月份
+                    if year == start_year and month_num < start_month_num:
+                        continue
+                    if year == end_year and month_num > end_month_num:
+                        continue
+                    months.append(f"{year}-{month_num:02d}")
+        
+        args = (months, resource_type, product_type, search, sort_by, offset, limit)
+        if limit > MAX_PAGE_SIZE:
+            return json_response(build_cost_page(*args))
+        return _get_cached(request, get_cost_page, *args)
 
 # 资源费用统计API视图
 class ResourceCostStatsView(View):
     def get(self, request):
-        from django.core.cache import cache
-        
+        """force=1强制刷新缓存，仅管理员可用"""
         month = request.GET.get('month', '')
-        
-        # 生成缓存键
-        cache_key = f"resource_cost_stats_{month}"
-        
-        # 尝试从缓存获取数据
-        cached_data = cache.get(cache_key)
-        if cached_data and not request.GET.get('force', '0') == '1':
-            print(f"从缓存返回统计数据: {cache_key}")
-            return json_response(cached_data)
-        
-        # 按资源类型统计费用总额
-        stats_by_type = []
-        for resource_type in ['ECS实例', '云盘', '弹性IP']:
-            filters = {'resource_type': resource_type}
-            if month:
-                filters['month'] = month
-                
-            queryset = ResourceCost.objects.filter(**filters)
-            total = queryset.count()
-            if total > 0:
-                sum_price = sum(float(item.finance_price) for item in queryset)
-                stats_by_type.append({
-                    'type': resource_type,
-                    'count': total,
-                    'total_cost': round(sum_price, 2)
-                })
-        
-        # 按月份统计费用总额
-        months = ResourceCost.objects.values_list('month', flat=True).distinct()
-        stats_by_month = []
-        for month in months:
-            queryset = ResourceCost.objects.filter(month=month)
-            sum_price = sum(float(item.finance_price) for item in queryset)
-            stats_by_month.append({
-                'month': month,
-                'total_cost': round(sum_price, 2)
+        return _get_cached(request, get_cost_stats, month)
+
+# 费用异常API视图，按严重程度排序
+class CostAnomalyView(View):
+    def get(self, request):
+        form, error = JsonParser(
+            Argument('month', required=False),
+            Argument('resource_type', required=False),
+            Argument('offset', type=int, default=0, filter=lambda x: x >= 0, help='参数错误'),
+            Argument('limit', type=int, default=10, filter=lambda x: x > 0, help='参数错误'),
+        ).parse(request.GET)
+        if error is None:
+            limit = min(form.limit, 100)
+            queryset = CostAnomaly.objects.all()
+            if form.month:
+                queryset = queryset.filter(month=form.month)
+            if form.resource_type:
+                queryset = queryset.filter(resource_type=form.resource_type)
+
+            return json_response({
+                'total': queryset.count(),
+                'data': [x.to_view() for x in queryset[form.offset:form.offset + limit]]
             })
-        
-        # 构建响应数据
-        response_data = {
-            'stats_by_type': stats_by_type,
-            'stats_by_month': stats_by_month
-        }
-        
-        # 将结果保存到缓存（设置10分钟过期）
-        cache.set(cache_key, response_data, 600)  # 缓存10分钟
-        
-        # 返回结果
-        return json_response(response_data)
+        return json_response(error=error)
 
 # 实例统计视图 - 用于提供操作系统分布和服务器配置分布的统计数据
 class InstanceStatsView(View):
     def get(self, request):
-        from django.core.cache import cache
-        from django.db.models import Count
-        from collections import defaultdict
-        
-        # 生成缓存键
-        cache_key = "instance_stats"
-        
-        # 尝试从缓存获取数据
-        cached_data = cache.get(cache_key)
-        if cached_data and not request.GET.get('force', '0') == '1':
-            print(f"从缓存返回实例统计数据")
-            return json_response(cached_data)
-        
-        # 获取所有实例
-        instances = Instance.objects.all()
-        
-        # 操作系统分布统计
-        os_stats = defaultdict(int)
-        for instance in instances:
-            # 如果os_name存在且不为None，否则标记为"其他"
-            os_name = instance.os_name if instance.os_name else '其他'
-            os_stats[os_name] += 1
-        
-        # 将操作系统分布转换为列表格式
-        os_distribution = [
-            {'name': name, 'value': count}
-            for name, count in os_stats.items()
-        ]
-        
-        # 服务器配置分布统计 (基于CPU和内存)
-        config_stats = defaultdict(int)
-        for instance in instances:
-            if instance.cpu_count is not None and instance.memory_capacity_in_gb is not None:
-                # 将服务器按配置分类
-                cpu = instance.cpu_count
-                memory = instance.memory_capacity_in_gb
-                
-                # 分类逻辑
-                if cpu == 2 and memory <= 4:
-                    config = '2核4G'
-                elif cpu == 2 and memory <= 8:
-                    config = '2核8G'
-                elif cpu == 4 and memory <= 8:
-                    config = '4核8G'
-                elif cpu == 8 and memory <= 16:
-                    config = '8核16G'
-                elif cpu == 16 and memory <= 32:
-                    config = '16核32G'
-                else:
-                    config = '其他'
-                
-                config_stats[config] += 1
-            else:
-                config_stats['其他'] += 1
-        
-        # 将服务器配置分布转换为列表格式
-        config_distribution = [
-            {'name': name, 'value': count}
-            for name, count in config_stats.items()
-        ]
-        
-        # 构建响应数据
-        response_data = {
-            'os_distribution': os_distribution,
-            'config_distribution': config_distribution
-        }
-        
-        # 将结果保存到缓存（设置1小时过期）
-        cache.set(cache_key, response_data, 60 * 60)  # 缓存1小时
-        
-        # 返回结果
-        return json_response(response_data)
+        return json_response(get_instance_stats())
 
 # 成本趋势API视图
 class CostTrendView(View):
     def get(self, request):
-        from django.core.cache import cache
+        """force=1强制刷新缓存，仅管理员可用"""
         import datetime
         
         # 获取请求参数
         mode = request.GET.get('mode', 'monthly')  # monthly或yearly
-        year = request.GET.get('year', datetime.datetime.now().year)
-        
-        # 生成缓存键
-        cache_key = f"cost_trend_{mode}_{year}"
-        
-        # 尝试从缓存获取数据
-        cached_data = cache.get(cache_key)
-        if cached_data and not request.GET.get('force', '0') == '1':
-            return json_response(cached_data)
+        year = request.GET.get('year', str(datetime.datetime.now().year))
         
         if mode == 'monthly':
-            # 按月查询指定年份的资源消费数据
-            # 计算资源 (ECS实例)
-            compute_costs = []
-            storage_costs = []
-            network_costs = []
-            
-            # 遍历12个月
-            for month in range(1, 13):
-                month_str = f"{year}-{month:02d}"
-                
-                # 计算资源费用 - ECS实例
-                compute_query = ResourceCost.objects.filter(
-                    resource_type='ECS实例',
-                    month=month_str
-                )
-                compute_cost = sum(float(str(record.finance_price).replace('¥', '').replace(',', '')) 
-                                for record in compute_query) if compute_query else 0
-                compute_costs.append(round(compute_cost, 2))
-                
-                # 存储资源费用 - 云盘
-                storage_query = ResourceCost.objects.filter(
-                    resource_type='云盘',
-                    month=month_str
-                )
-                storage_cost = sum(float(str(record.finance_price).replace('¥', '').replace(',', '')) 
-                                for record in storage_query) if storage_query else 0
-                storage_costs.append(round(storage_cost, 2))
-                
-                # 网络资源费用 - 弹性IP
-                network_query = ResourceCost.objects.filter(
-                    resource_type='弹性IP',
-                    month=month_str
-                )
-                network_cost = sum(float(str(record.finance_price).replace('¥', '').replace(',', '')) 
-                                for record in network_query) if network_query else 0
-                network_costs.append(round(network_cost, 2))
-            
-            # 如果某月没有数据，使用趋势预测或平均值填充
-            for i in range(len(compute_costs)):
-                if compute_costs[i] == 0 and i > 0:
-                    # 简单使用上月数据作为预测
-                    compute_costs[i] = compute_costs[i-1]
-                if storage_costs[i] == 0 and i > 0:
-                    storage_costs[i] = storage_costs[i-1]
-                if network_costs[i] == 0 and i > 0:
-                    network_costs[i] = network_costs[i-1]
-            
-            response_data = {
-                'year': year,
-                'compute': compute_costs,
-                'storage': storage_costs,
-                'network': network_costs
-            }
-            
-            # 缓存数据 (1小时)
-            cache.set(cache_key, response_data, 60 * 60)
-            
-            return json_response(response_data)
-            
+            if not str(year).isdigit():
+                return json_response(error='无效的年份参数')
+            return _get_cached(request, get_monthly_cost_trend, year)
         elif mode == 'yearly':
-            # 获取最近几年的数据，包括当前年份和未来2年的预测
-            current_year = datetime.datetime.now().year
-            start_year = 2021  # 从2021年开始
-            end_year = current_year + 2
-            
-            years = list(range(start_year, end_year + 1))
-            compute_yearly = []
-            storage_yearly = []
-            network_yearly = []
-            
-            # 对于每一年，计算总费用
-            for year in years:
-                # 如果是2025年及以后，使用预测值
-                if year >= 2025:
-                    # 简单的线性增长预测，每年增长10%
-                    if compute_yearly:
-                        compute_yearly.append(round(compute_yearly[-1] * 1.10))
-                        storage_yearly.append(round(storage_yearly[-1] * 1.10))
-                        network_yearly.append(round(network_yearly[-1] * 1.10))
-                    continue
-                
-                # 获取该年的所有月份数据
-                compute_cost = 0
-                storage_cost = 0
-                network_cost = 0
-                
-                # 遍历年份的12个月
-                for month in range(1, 13):
-                    month_str = f"{year}-{month:02d}"
-                    
-                    # 计算资源费用
-                    compute_query = ResourceCost.objects.filter(
-                        resource_type='ECS实例',
-                        month=month_str
-                    )
-                    if compute_query:
-                        compute_cost += sum(float(str(record.finance_price).replace('¥', '').replace(',', '')) 
-                                          for record in compute_query)
-                    
-                    # 存储资源费用
-                    storage_query = ResourceCost.objects.filter(
-                        resource_type='云盘',
-                        month=month_str
-                    )
-                    if storage_query:
-                        storage_cost += sum(float(str(record.finance_price).replace('¥', '').replace(',', '')) 
-                                          for record in storage_query)
-                    
-                    # 网络资源费用
-                    network_query = ResourceCost.objects.filter(
-                        resource_type='弹性IP',
-                        month=month_str
-                    )
-                    if network_query:
-                        network_cost += sum(float(str(record.finance_price).replace('¥', '').replace(',', '')) 
-                                          for record in network_query)
-                
-                compute_yearly.append(round(compute_cost))
-                storage_yearly.append(round(storage_cost))
-                network_yearly.append(round(network_cost))
-            
-            response_data = {
-                'years': [str(y) for y in years],
-                'compute': compute_yearly,
-                'storage': storage_yearly,
-                'network': network_yearly
-            }
-            
-            # 缓存数据 (24小时)
-            cache.set(cache_key, response_data, 24 * 60 * 60)
-            
-            return json_response(response_data)
-            
+            return _get_cached(request, get_yearly_cost_trend)
         return json_response(error='无效的模式参数')
 
+# 实例费用预测API视图
+class CostForecastView(View):
+    def get(self, request):
+        """force=1强制刷新缓存，仅管理员可用"""
+        form, error = JsonParser(
+            Argument('steps', type=int, default=3, filter=lambda x: 0 < x <= 12, help='预测月数须在1到12之间'),
+            Argument('offset', type=int, default=0, filter=lambda x: x >= 0, help='参数错误'),
+            Argument('limit', type=int, default=10, filter=lambda x: 0 < x <= 100, help='参数错误'),
+        ).parse(request.GET)
+        if error is None:
+            return _get_cached(request, get_instance_forecast, form.steps, form.offset, form.limit)
+        return json_response(error=error)
+
 # Dashboard统计视图
 class DashboardStatsView(View):
     def get(self, request):
-        from django.core.cache import cache
-        import datetime
-        from dateutil.relativedelta import relativedelta
-        
-        # 生成缓存键
-        cache_key = "dashboard_stats_summary"
-        
-        # 尝试从缓存获取数据
-        cached_data = cache.get(cache_key)
-        if cached_data and not request.GET.get('force', '0') == '1':
-            print(f"从缓存返回仪表盘统计数据")
-            return json_response(cached_data)
-        
-        # 计算主机总数
-        host_count = Instance.objects.count()
-        
-        # 计算在线主机数量
-        online_count = Instance.objects.filter(status='Running').count()
-        
-        # 计算30天内即将到期的主机数量
-        now = datetime.datetime.now()
-        thirty_days_later = now + relativedelta(days=30)
-        now_str = now.strftime('%Y-%m-%d')
-        thirty_days_later_str = thirty_days_later.strftime('%Y-%m-%d')
-        
-        expiring_count = Instance.objects.filter(
-            expire_time__gte=now_str,
-            expire_time__lte=thirty_days_later_str
-        ).count()
-        
-        # 计算上个月的支出总额
-        last_month = now - relativedelta(months=1)
-        last_month_str = last_month.strftime('%Y-%m')
-        
-        # 计算当前年度的累计费用
-        current_year = now.year
-        current_month = now.month
-        yearly_costs = {
-            'compute': 0,
-            'storage': 0,
-            'network': 0
-        }
-        
-        # 获取当前年度到目前为止的所有月份的费用数据
-        for month in range(1, current_month + 1):
-            month_str = f"{current_year}-{month:02d}"
-            
-            # 计算资源费用
-            compute_query = ResourceCost.objects.filter(
-                resource_type='ECS实例',
-                month=month_str
-            )
-            if compute_query:
-                yearly_costs['compute'] += sum(float(str(record.finance_price).replace('¥', '').replace(',', '')) 
-                                          for record in compute_query)
-            
-            # 存储资源费用
-            storage_query = ResourceCost.objects.filter(
-                resource_type='云盘',
-                month=month_str
-            )
-            if storage_query:
-                yearly_costs['storage'] += sum(float(str(record.finance_price).replace('¥', '').replace(',', '')) 
-                                          for record in storage_query)
-            
-            # 网络资源费用
-            network_query = ResourceCost.objects.filter(
-                resource_type='弹性IP',
-                month=month_str
-            )
-            if network_query:
-                yearly_costs['network'] += sum(float(str(record.finance_price).replace('¥', '').replace(',', '')) 
-                                          for record in network_query)
-        
-        # 计算上个月总支出
-        monthly_expense_query = ResourceCost.objects.filter(month=last_month_str)
-        monthly_expense = sum(float(str(item.finance_price).replace('¥', '').replace(',', '')) 
-                            for item in monthly_expense_query)
-                
-        # 准备响应数据
-        response_data = {
-            'hostCount': host_count,
-            'onlineCount': online_count,
-            'expiringCount': expiring_count,
-            'monthlyExpense': round(monthly_expense),
-            'yearlyCompute': round(yearly_costs['compute']),
-            'yearlyStorage': round(yearly_costs['storage']),
-            'yearlyNetwork': round(yearly_costs['network'])
-        }
-        
-        # 缓存结果（1小时过期）
-        cache.set(cache_key, response_data, 60 * 60)
-        
-        # 返回结果
-        return json_response(response_data)
+        """force=1强制刷新缓存，仅管理员可用"""
+        return _get_cached(request, get_dashboard_summary)
+
+
+def _get_cached(request, func, *args):
+    """读取统计缓存并返回响应
+
+    force=1表示忽略缓存重新计算，重新计算开销较大，仅管理员可用，非管理员请求时返回错误而不是静默读取缓存。
+    """
+    if request.GET.get('force') == '1':
+        if not request.user.is_supper:
+            return json_response(error='仅管理员可强制刷新缓存')
+        return json_response(func.refresh(*args))
+    return json_response(func(*args))
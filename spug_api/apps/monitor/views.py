@@ -7,6 +7,7 @@ from django_redis import get_redis_connection
 from libs import json_response, JsonParser, Argument, human_datetime, auth
 from apps.monitor.models import Detection
 from apps.monitor.executors import dispatch
+from apps.host.references import sync_host_refs
 from apps.setting.utils import AppSetting
 from datetime import datetime
 import json
@@ -49,6 +50,8 @@ class DetectionView(View):
                     updated_by=request.user,
                     **form)
                 task = Detection.objects.filter(pk=form.id).first()
+                if task:
+                    sync_host_refs('detection', task)
                 if task and task.is_active:
                     form.action = 'modify'
                     rds_cli = get_redis_connection()
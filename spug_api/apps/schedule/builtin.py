@@ -11,6 +11,8 @@ from apps.exec.models import ExecHistory, Transfer
 from apps.notify.models import Notify
 from apps.deploy.utils import dispatch
 from apps.repository.models import Repository
+from apps.host.stats import refresh_dashboard_stats
+from apps.host.changes import prune_changes
 from libs.utils import parse_time, human_datetime, human_date
 from datetime import datetime, timedelta
 from threading import Thread
@@ -26,6 +28,7 @@ def auto_run_by_day():
         date_30 = human_date(datetime.now() - timedelta(days=30))
         History.objects.filter(created_at__lt=date_30).delete()
         Notify.objects.filter(created_at__lt=date_7, unread=False).delete()
+        prune_changes(date_30)
         Alarm.objects.filter(created_at__lt=date_30).delete()
         for item in DeployExtend1.objects.all():
             index = 0
@@ -86,3 +89,10 @@ def auto_run_by_minute():
             Thread(target=dispatch, args=(req,)).start()
     finally:
         connections.close_all()
+
+
+def auto_refresh_stats():
+    try:
+        refresh_dashboard_stats()
+    finally:
+        connections.close_all()
@@ -10,9 +10,10 @@ from django_redis import get_redis_connection
 from django.db import connections
 from django.db.utils import DatabaseError
 from apps.schedule.models import Task, History
-from apps.schedule.builtin import auto_run_by_day, auto_run_by_minute
+from apps.schedule.builtin import auto_run_by_day, auto_run_by_minute, auto_refresh_stats
 from django.conf import settings
 from libs import AttrDict, human_datetime
+from datetime import datetime
 import logging
 import json
 
@@ -61,6 +62,7 @@ class Scheduler:
     def _init_builtin_jobs(self):
         self.scheduler.add_job(auto_run_by_day, 'cron', hour=1, minute=20)
         self.scheduler.add_job(auto_run_by_minute, 'interval', minutes=1)
+        self.scheduler.add_job(auto_refresh_stats, 'interval', minutes=5, next_run_time=datetime.now())
 
     def _dispatch(self, task_id, interpreter, command, targets):
         output = {x: None for x in targets}
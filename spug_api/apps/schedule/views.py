@@ -9,6 +9,7 @@ from apps.schedule.scheduler import Scheduler
 from apps.schedule.models import Task, History
 from apps.schedule.executors import dispatch_job
 from apps.host.models import Host
+from apps.host.references import sync_host_refs
 from django.conf import settings
 from libs import json_response, JsonParser, Argument, human_datetime, auth
 import json
@@ -55,6 +56,8 @@ class Schedule(View):
                     **form
                 )
                 task = Task.objects.filter(pk=form.id).first()
+                if task:
+                    sync_host_refs('task', task)
                 if task and task.is_active:
                     form.action = 'modify'
                     form.targets = json.loads(form.targets)
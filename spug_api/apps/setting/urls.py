@@ -12,6 +12,7 @@ urlpatterns = [
     re_path(r'^email_test/$', email_test),
     re_path(r'^mfa/$', MFAView.as_view()),
     re_path(r'^about/$', get_about),
+    re_path(r'^ssh_pool/$', get_ssh_pool),
     re_path(r'^push/bind/$', handle_push_bind),
     re_path(r'^push/balance/$', handle_push_balance),
 ]
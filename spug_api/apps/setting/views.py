@@ -8,6 +8,7 @@ from libs import JsonParser, Argument, json_response, auth
 from libs.utils import generate_random_str
 from libs.mail import Mail
 from libs.push import get_balance, send_login_code
+from libs.ssh import ssh_pool
 from libs.mixins import AdminView
 from apps.setting.utils import AppSetting
 from apps.setting.models import Setting, KEYS_DEFAULT
@@ -126,6 +127,12 @@ def get_about(request):
     })
 
 
+@auth('admin')
+def get_ssh_pool(request):
+    # 连接池按进程独立，返回的是处理当前请求的进程中的统计
+    return json_response(ssh_pool.stats())
+
+
 @auth('admin')
 def handle_push_bind(request):
     form, error = JsonParser(
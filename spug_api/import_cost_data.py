@@ -5,138 +5,221 @@ import os
 import json
 import django
 import sys
-import glob
+from concurrent import futures
 
 # 设置Django环境
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'spug.settings')
 django.setup()
 
 # 导入模型
+from django.db import connections, transaction
 from apps.host.models import ResourceCost
+from apps.host.cost import refresh_cost_change, refresh_cost_summary, to_cents, from_cents
+from apps.host.anomaly import detect_cost_anomalies
+from apps.host.utils import bump_data_version
 from libs import human_datetime
 
-def import_cost_data(clear_existing=True):
-    """导入成本数据
-    
+# 定义资源类型映射
+RESOURCE_TYPES = {
+    'bcccost_monthly.json': 'ECS实例',
+    'cdscost_monthly.json': '云盘',
+    'eipcost_monthly.json': '弹性IP'
+}
+
+
+def import_cost_data(clear_existing=False):
+    """导入成本数据，按(月份, 实例ID, 资源类型, 计费类型)增量更新
+
     Args:
-        clear_existing (bool): 是否清除现有数据
+        clear_existing (bool): 是否先清除现有数据
     """
-    # 首先清空所有现有数据，重新导入
     if clear_existing:
         ResourceCost.objects.all().delete()
         print("已清空现有资源费用数据")
-    
-    # 定义资源类型映射
-    resource_types = {
-        'bcccost_monthly.json': 'ECS实例',
-        'cdscost_monthly.json': '云盘',
-        'eipcost_monthly.json': '弹性IP'
-    }
-    
+
     # 检查test/price目录
     price_dir = os.path.join('..', 'test', 'price')
     if not os.path.exists(price_dir):
         price_dir = os.path.join('test', 'price')
-    
+
     if os.path.exists(price_dir):
         # 遍历年份目录
-        year_dirs = [d for d in os.listdir(price_dir) if os.path.isdir(os.path.join(price_dir, d))]
-        
-        if year_dirs:
-            print(f"找到年份目录: {', '.join(year_dirs)}")
-            
-            for year in year_dirs:
-                year_dir = os.path.join(price_dir, year)
-                
-                # 导入每个JSON文件的数据
-                for json_file, resource_type in resource_types.items():
-                    file_path = os.path.join(year_dir, json_file)
-                    
-                    if os.path.exists(file_path):
-                        print(f"正在导入{year}年{resource_type}费用数据...")
-                        import_file(file_path, resource_type)
-                    else:
-                        print(f"文件不存在: {file_path}")
-        else:
+        year_dirs = [os.path.join(price_dir, d) for d in sorted(os.listdir(price_dir))
+                     if os.path.isdir(os.path.join(price_dir, d))]
+        if not year_dirs:
             print(f"在{price_dir}目录下未找到年份子目录")
     else:
+        # 使用原有的文件路径（兼容原有代码，JSON文件位于spug_web/src/pages/cost/data/下）
         print(f"目录不存在: {price_dir}，尝试使用默认路径")
-        
-        # 使用原有的文件路径（兼容原有代码）
-        for json_file, resource_type in resource_types.items():
-            # 构建文件路径 (JSON文件位于spug_web/src/pages/cost/data/下)
-            file_path = os.path.join('..', 'spug_web', 'src', 'pages', 'cost', 'data', json_file)
-            
-            if os.path.exists(file_path):
-                print(f"正在导入{resource_type}费用数据（默认路径）...")
-                import_file(file_path, resource_type)
-            else:
-                print(f"文件不存在: {file_path}")
-    
+        year_dirs = [os.path.join('..', 'spug_web', 'src', 'pages', 'cost', 'data')]
+
+    summary = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0}
+    months = set()
+    if year_dirs:
+        print(f"正在解析: {', '.join(year_dirs)}")
+        # 各年份目录在子进程中并行解析，数据库写入统一在主进程完成
+        connections.close_all()
+        with futures.ProcessPoolExecutor(max_workers=min(len(year_dirs), os.cpu_count() or 1)) as executor:
+            for results in executor.map(load_year_dir, year_dirs):
+                for file_path, resource_type, data in results:
+                    counter = upsert_cost_data(resource_type, data)
+                    print(f"已导入{resource_type}费用数据（{file_path}）: 新增 {counter['inserted']} 条, "
+                          f"更新 {counter['updated']} 条, 未变化 {counter['unchanged']} 条, 删除 {counter['deleted']} 条")
+                    months.update(counter.pop('months'))
+                    for key, value in counter.items():
+                        summary[key] += value
+
+    if months or clear_existing:
+        # 重新计算环比变化，清空重导时全部重新计算
+        count = refresh_cost_change(None if clear_existing else months)
+        print(f"已更新 {count} 条环比数据")
+
+        # 刷新月度汇总表
+        count = refresh_cost_summary(None if clear_existing else months)
+        print(f"已刷新 {count} 条月度汇总数据")
+
+        # 更新数据版本，通知各进程重新加载费用数据
+        bump_data_version('cost')
+
+        # 重新检测费用异常
+        count = detect_cost_anomalies()
+        print(f"检测到 {count} 条费用异常")
+
     # 验证导入的数据
     verify_imported_data()
-    
-    print("费用数据导入完成")
 
-def import_file(file_path, resource_type):
-    """导入单个文件的数据
-    
-    Args:
-        file_path (str): 文件路径
-        resource_type (str): 资源类型
+    print(f"费用数据导入完成: 新增 {summary['inserted']} 条, 更新 {summary['updated']} 条, "
+          f"未变化 {summary['unchanged']} 条, 删除 {summary['deleted']} 条")
+    return summary
+
+
+def iter_json_array(file_path, chunk_size=64 * 1024):
+    """逐个读取JSON数组中的元素，不需要把整个文件载入内存"""
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r', encoding='utf-8') as f:
+        buffer, started = '', False
+        while True:
+            chunk = f.read(chunk_size)
+            buffer += chunk
+            index = 0
+            while True:
+                while index < len(buffer) and buffer[index] in ' \t\r\n,':
+                    index += 1
+                if index == len(buffer):
+                    break
+                if not started:
+                    if buffer[index] != '[':
+                        raise json.JSONDecodeError('Expecting \'[\'', buffer, index)
+                    started = True
+                    index += 1
+                    continue
+                if buffer[index] == ']':
+                    return
+                try:
+                    item, end = decoder.raw_decode(buffer, index)
+                except json.JSONDecodeError:
+                    # 元素被截断在块边界，继续读取
+                    if not chunk:
+                        raise
+                    break
+                if end == len(buffer) and chunk:
+                    # 恰好结束在块边界的元素可能不完整（例如数字），读取更多数据后再解析
+                    break
+                index = end
+                yield item
+            buffer = buffer[index:]
+            if not chunk:
+                if buffer.strip():
+                    raise json.JSONDecodeError('Unexpected end of data', buffer, 0)
+                return
+
+
+def load_file(file_path):
+    """解析单个文件，同一资源同一月份的多笔费用合并累加
+
+    Returns:
+        dict: {(month, instance_id, product_type): [instance_name, 费用(分)]}
     """
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            
-        count = 0
-        
-        # 创建批量插入数据列表
-        bulk_data = []
-        
-        # 获取管理员用户
-        from apps.account.models import User
-        admin = User.objects.filter(is_supper=True).first()
-        if not admin:
-            print("未找到管理员用户，将使用NULL")
-        
-        # 遍历数据并准备插入
-        for item in data:
-            try:
-                # 创建记录对象但不保存
-                cost_record = ResourceCost(
-                    month=item.get('month'),
-                    instance_id=item.get('instanceid'),
-                    instance_name=item.get('instance_name', item.get('instanceid')),
-                    resource_type=resource_type,
-                    product_type=item.get('productType'),
-                    finance_price=float(item.get('financePrice', 0)),
-                    created_at=human_datetime()
-                )
-                bulk_data.append(cost_record)
-                count += 1
-                
-                # 每1000条数据批量插入一次
-                if len(bulk_data) >= 1000:
-                    ResourceCost.objects.bulk_create(bulk_data)
-                    bulk_data = []
-                    print(f"已批量导入 {count} 条记录")
-                    
-            except Exception as e:
-                print(f"准备数据时出错: {e}, 数据: {item}")
-        
-        # 插入剩余数据
-        if bulk_data:
-            ResourceCost.objects.bulk_create(bulk_data)
-        
-        print(f"已导入 {count} 条{resource_type}费用数据（{file_path}）")
-        
-    except FileNotFoundError:
-        print(f"文件不存在: {file_path}")
-    except json.JSONDecodeError:
-        print(f"JSON格式错误: {file_path}")
-    except Exception as e:
-        print(f"导入数据时出错: {e}")
+    data = {}
+    for item in iter_json_array(file_path):
+        try:
+            key = (item['month'], item['instanceid'], item.get('productType') or '')
+            price = to_cents(item.get('financePrice', 0))
+            name = item.get('instance_name', item['instanceid'])
+        except Exception as e:
+            print(f"准备数据时出错: {e}, 数据: {item}")
+            continue
+        if key in data:
+            data[key][1] += price
+        else:
+            data[key] = [name, price]
+    return data
+
+
+def load_year_dir(year_dir):
+    """解析一个年份目录下的所有费用文件（在子进程中执行）"""
+    results = []
+    for json_file, resource_type in RESOURCE_TYPES.items():
+        file_path = os.path.join(year_dir, json_file)
+        if not os.path.exists(file_path):
+            print(f"文件不存在: {file_path}")
+            continue
+        try:
+            results.append((file_path, resource_type, load_file(file_path)))
+        except json.JSONDecodeError:
+            print(f"JSON格式错误: {file_path}")
+    return results
+
+
+def upsert_cost_data(resource_type, data):
+    """将解析后的费用数据与数据库比对，只写入有变化的记录
+
+    文件中涉及的月份以文件为准，数据库中多出的记录会被删除。
+
+    Returns:
+        dict: 新增、更新、未变化、删除的条数以及有变化的月份
+    """
+    counter = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0, 'months': set()}
+    existing = {}
+    queryset = ResourceCost.objects.filter(resource_type=resource_type, month__in={x[0] for x in data})
+    for pk, month, instance_id, product_type, name, price in queryset.values_list(
+            'id', 'month', 'instance_id', 'product_type', 'instance_name', 'price_cents'):
+        existing[(month, instance_id, product_type)] = (pk, name, price)
+
+    inserts, updates = [], []
+    for key, (name, price) in data.items():
+        month, instance_id, product_type = key
+        record = existing.pop(key, None)
+        if record is None:
+            inserts.append(ResourceCost(
+                month=month,
+                instance_id=instance_id,
+                instance_name=name,
+                resource_type=resource_type,
+                product_type=product_type,
+                finance_price=from_cents(price),
+                price_cents=price,
+                created_at=human_datetime()
+            ))
+        elif record[1] != name or record[2] != price:
+            updates.append(ResourceCost(id=record[0], instance_name=name, finance_price=from_cents(price), price_cents=price))
+        else:
+            counter['unchanged'] += 1
+            continue
+        counter['months'].add(month)
+    stale_ids = [pk for pk, _, _ in existing.values()]
+    counter['months'].update(key[0] for key in existing)
+
+    with transaction.atomic():
+        ResourceCost.objects.bulk_create(inserts, batch_size=500)
+        ResourceCost.objects.bulk_update(updates, ['instance_name', 'finance_price', 'price_cents'], batch_size=1000)
+        for i in range(0, len(stale_ids), 500):
+            ResourceCost.objects.filter(id__in=stale_ids[i:i + 500]).delete()
+    counter['inserted'] = len(inserts)
+    counter['updated'] = len(updates)
+    counter['deleted'] = len(stale_ids)
+    return counter
+
 
 def verify_imported_data():
     """验证导入的数据"""
@@ -144,11 +227,11 @@ def verify_imported_data():
     print("\n验证导入的数据:")
     total_count = ResourceCost.objects.count()
     print(f"总数据条数: {total_count}")
-    
+
     for resource_type in ['ECS实例', '云盘', '弹性IP']:
         count = ResourceCost.objects.filter(resource_type=resource_type).count()
         print(f"{resource_type}数据条数: {count}")
-        
+
         # 打印示例数据
         if count > 0:
             sample = ResourceCost.objects.filter(resource_type=resource_type).first()
@@ -156,14 +239,14 @@ def verify_imported_data():
 
 if __name__ == "__main__":
     # 检查命令行参数
-    clear_data = True
-    if len(sys.argv) > 1 and sys.argv[1].lower() == 'no-clear':
-        clear_data = False
-        print("将不清除现有数据，仅添加新数据")
-    
+    clear_data = False
+    if len(sys.argv) > 1 and sys.argv[1].lower() == 'clear':
+        clear_data = True
+        print("将清除现有数据后重新导入")
+
     try:
         import_cost_data(clear_existing=clear_data)
     except KeyboardInterrupt:
         print("\n导入过程被中断")
     except Exception as e:
-        print(f"导入过程中发生错误: {e}") 
\ No newline at end of file
+        print(f"导入过程中发生错误: {e}")
@@ -0,0 +1,103 @@
+# Copyright: (c) OpenSpug Organization. https://github.com/openspug/spug
+# Copyright: (c) <spug.dev@gmail.com>
+# Released under the AGPL-3.0 License.
+from django.core.cache import cache
+from django.db import connections
+from functools import wraps
+from threading import Thread
+import hashlib
+import time
+
+
+def single_flight(key, load, compute, wait=10):
+    """load返回None表示未命中，此时只允许一个进程执行compute，其它请求等待计算结果
+
+    Args:
+        key (str): 缓存键，用于生成计算锁
+        load (callable): 读取缓存
+        compute (callable): 重新计算并写入缓存
+        wait (int): 等待其它进程计算的最长时间（秒），超时后自行计算
+    """
+    value = load()
+    if value is not None:
+        return value
+    lock_key = f'{key}:lock'
+    deadline = time.time() + wait
+    while not cache.add(lock_key, 1, wait):
+        time.sleep(0.05)
+        value = load()
+        if value is not None:
+            return value
+        if time.time() > deadline:
+            return compute()
+    try:
+        # 拿到锁之前可能已有其它进程写入了结果
+        value = load()
+        if value is None:
+            value = compute()
+    finally:
+        cache.delete(lock_key)
+    return value
+
+
+# 缓存条目为(数据版本号, 过期时间, 值)，版本号一致且未过期时才有效
+def _fresh_value(entry, version):
+    if entry and entry[0] == version and entry[1] > time.time():
+        return entry[2]
+
+
+def cached(name, timeout=3600, version=None, stale=0):
+    """缓存函数的返回值，缓存中同时记录数据版本号和过期时间
+
+    Args:
+        name (str): 缓存名称
+        timeout (int): 缓存有效期（秒）
+        version (callable): 返回当前数据版本号，数据变更后版本号变化，缓存随之失效
+        stale (int): 失效后仍可返回旧数据的时长（秒），期间由后台线程重新计算，请求不会被阻塞
+
+    被装饰的函数增加refresh方法，用于忽略缓存立即重新计算。
+    """
+    def decorate(func):
+        def make_key(*args):
+            suffix = ':'.join(str(x) for x in args)
+            if len(suffix) > 128:
+                suffix = hashlib.md5(suffix.encode()).hexdigest()
+            return f'spug:cache:{name}:{suffix}'
+
+        def get_version():
+            return str(version()) if version else ''
+
+        def compute(key, current, args):
+            value = func(*args)
+            cache.set(key, (current, time.time() + timeout, value), timeout + stale)
+            return value
+
+        def revalidate(key, current, args):
+            try:
+                compute(key, current, args)
+            finally:
+                cache.delete(f'{key}:lock')
+                connections.close_all()
+
+        @wraps(func)
+        def wrapper(*args):
+            key, current = make_key(*args), get_version()
+            entry = cache.get(key)
+            value = _fresh_value(entry, current)
+            if value is not None:
+                return value
+            if entry and stale:
+                # 先返回旧数据，由后台线程重新计算
+                if cache.add(f'{key}:lock', 1, 60):
+                    Thread(target=revalidate, args=(key, current, args)).start()
+                return entry[2]
+            load = lambda: _fresh_value(cache.get(key), current)
+            return single_flight(key, load, lambda: compute(key, current, args))
+
+        def refresh(*args):
+            return compute(make_key(*args), get_version(), args)
+
+        wrapper.refresh = refresh
+        return wrapper
+
+    return decorate
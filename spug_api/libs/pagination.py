@@ -0,0 +1,102 @@
+# Copyright: (c) OpenSpug Organization. https://github.com/openspug/spug
+# Copyright: (c) <spug.dev@gmail.com>
+# Released under the AGPL-3.0 License.
+from django.db.models import F, Q
+from .utils import json_response
+from functools import reduce
+import base64
+import json
+
+
+class Pager:
+    """列表接口的服务端过滤、排序和游标分页
+
+    请求参数：
+        过滤字段: 精确匹配，只允许filters中声明的字段
+        search: 在search_fields中模糊匹配
+        sort: 排序字段，前缀-表示倒序，只允许sorts中声明的字段
+        page_size / cursor: 游标分页，cursor为上一页返回的next
+        with_total: 为1时返回总数
+        fields: 逗号分隔，只返回指定的字段
+
+    未传page_size和cursor时返回全部数据，与原有接口保持一致。
+    """
+    def __init__(self, filters=(), sorts=('id',), search_fields=(), default_sort='-id', max_size=1000):
+        self.filters = filters
+        self.sorts = set(sorts) | {'id'}
+        self.search_fields = search_fields
+        self.default_sort = default_sort
+        self.max_size = max_size
+
+    @staticmethod
+    def encode_cursor(value, pk):
+        return base64.urlsafe_b64encode(json.dumps([value, pk]).encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return value, int(pk)
+
+    @staticmethod
+    def _after(field, value, pk, desc):
+        """游标之后的记录，空值在正序时排最前、倒序时排最后"""
+        op = 'lt' if desc else 'gt'
+        after_pk = Q(**{f'id__{op}': pk})
+        if field == 'id':
+            return after_pk
+        if value is None:
+            query = Q(**{f'{field}__isnull': True}) & after_pk
+            return query if desc else query | Q(**{f'{field}__isnull': False})
+        query = Q(**{f'{field}__{op}': value}) | (Q(**{field: value}) & after_pk)
+        return (query | Q(**{f'{field}__isnull': True})) if desc else query
+
+    def response(self, request, queryset, serialize):
+        """
+        Args:
+            queryset (QuerySet): 已按权限过滤的查询集
+            serialize (callable): 将一页记录转换为字典列表
+        """
+        params = request.GET
+        for key in self.filters:
+            if params.get(key):
+                queryset = queryset.filter(**{key: params[key]})
+        search = params.get('search')
+        if search and self.search_fields:
+            queries = [Q(**{f'{x}__icontains': search}) for x in self.search_fields]
+            queryset = queryset.filter(reduce(lambda a, b: a | b, queries))
+
+        paginated = 'page_size' in params or 'cursor' in params
+        sort = params.get('sort') or (self.default_sort if paginated else None)
+        if sort:
+            field, desc = sort.lstrip('-'), sort.startswith('-')
+            if field not in self.sorts:
+                return json_response(error=f'不支持按{field}排序')
+            if desc:
+                queryset = queryset.order_by(F(field).desc(nulls_last=True), '-id')
+            else:
+                queryset = queryset.order_by(F(field).asc(nulls_first=True), 'id')
+
+        total = queryset.count() if params.get('with_total') == '1' else None
+        next_cursor = None
+        if paginated:
+            try:
+                page_size = min(max(int(params.get('page_size', 50)), 1), self.max_size)
+                if params.get('cursor'):
+                    value, pk = self.decode_cursor(params['cursor'])
+                    queryset = queryset.filter(self._after(field, value, pk, desc))
+            except (ValueError, TypeError):
+                return json_response(error='无效的分页参数')
+            items = list(queryset[:page_size + 1])
+            if len(items) > page_size:
+                items = items[:page_size]
+                next_cursor = self.encode_cursor(getattr(items[-1], field), items[-1].id)
+        else:
+            items = list(queryset)
+
+        data = serialize(items)
+        if params.get('fields'):
+            fields = params['fields'].split(',')
+            data = [{k: x[k] for k in fields if k in x} for x in data]
+        if paginated or total is not None:
+            return json_response({'data': data, 'next': next_cursor, 'total': total})
+        return json_response(data)
@@ -0,0 +1,55 @@
+# Copyright: (c) OpenSpug Organization. https://github.com/openspug/spug
+# Copyright: (c) <spug.dev@gmail.com>
+# Released under the AGPL-3.0 License.
+from django.db import transaction
+from django.db.models import Max
+
+# 相邻记录的sort_id间隔，移动时取两侧的中间值，只有间隔用完时才重新分配
+RANK_STEP = 1024
+
+
+def next_rank(queryset):
+    """新记录排在最前（各模型均按sort_id倒序显示）"""
+    return (queryset.aggregate(rank=Max('sort_id'))['rank'] or 0) + RANK_STEP
+
+
+def rank_between(low, high):
+    """返回low和high之间的sort_id，None表示该侧没有记录，没有空隙时返回None"""
+    if low is None and high is None:
+        return RANK_STEP
+    if low is None:
+        return high - RANK_STEP
+    if high is None:
+        return low + RANK_STEP
+    if high - low > 1:
+        return (low + high) // 2
+
+
+def rebalance(queryset):
+    """按当前顺序重新等间隔分配sort_id"""
+    objects = list(queryset.order_by('sort_id', 'id').only('id', 'sort_id'))
+    for index, obj in enumerate(objects, start=1):
+        obj.sort_id = index * RANK_STEP
+    with transaction.atomic():
+        queryset.model.objects.bulk_update(objects, ['sort_id'], batch_size=500)
+
+
+def move_rank(obj, queryset, target, side):
+    """把obj放到target旁边，只修改obj的sort_id，由调用方保存
+
+    Args:
+        queryset (QuerySet): 参与排序的全部记录
+        target (Model): 相邻的记录
+        side (int): 1表示放在target的sort_id较大一侧（显示在target之前），-1表示较小一侧
+    """
+    others = queryset.exclude(pk=obj.pk).values_list('sort_id', flat=True)
+    if side > 0:
+        low, high = target.sort_id, others.filter(sort_id__gt=target.sort_id).order_by('sort_id').first()
+    else:
+        low, high = others.filter(sort_id__lt=target.sort_id).order_by('-sort_id').first(), target.sort_id
+    rank = rank_between(low, high)
+    if rank is None:
+        rebalance(queryset)
+        target.refresh_from_db(fields=['sort_id'])
+        return move_rank(obj, queryset, target, side)
+    obj.sort_id = rank
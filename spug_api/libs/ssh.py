@@ -3,11 +3,20 @@
 # Released under the AGPL-3.0 License.
 from paramiko.client import SSHClient, AutoAddPolicy
 from paramiko.rsakey import RSAKey
+from paramiko.ecdsakey import ECDSAKey
+from paramiko.ed25519key import Ed25519Key
 from paramiko.auth_handler import AuthHandler
 from paramiko.ssh_exception import AuthenticationException, SSHException
 from paramiko.py3compat import b, u
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+from collections import OrderedDict
+from functools import lru_cache
 from io import StringIO
-from uuid import uuid4
+import threading
+import base64
+import codecs
+import socket
 import time
 import re
 
@@ -48,46 +57,262 @@ def _finalize_pubkey_algorithm(self, key_type):
 
 AuthHandler._finalize_pubkey_algorithm = _finalize_pubkey_algorithm
 
+@lru_cache(maxsize=256)
+def load_private_key(text):
+    """解析私钥并缓存解析结果，同一个密钥批量连接大量主机时只解析一次
+
+    支持RSA、ECDSA和Ed25519，PEM格式和OpenSSH格式均可
+    """
+    for key_class in (RSAKey, Ed25519Key, ECDSAKey):
+        try:
+            return key_class.from_private_key(StringIO(text))
+        except (SSHException, ValueError):
+            continue
+    raise SSHException('不支持的私钥格式，仅支持RSA、ECDSA和Ed25519密钥')
+
+
+# 流式输出合并成帧的最大长度和最长等待时间（秒）
+STREAM_FRAME_SIZE = 16384
+STREAM_FRAME_INTERVAL = 0.05
+
+
+class _StreamDecoder:
+    """增量解码，多字节字符被拆分到两次recv时保留不完整的字节，utf-8解码失败时按GBK解码"""
+
+    def __init__(self):
+        self.utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.gbk = codecs.getincrementaldecoder('GBK')(errors='ignore')
+
+    def decode(self, data):
+        if not self.gbk.getstate()[0]:
+            try:
+                return self.utf8.decode(data)
+            except UnicodeDecodeError:
+                data = self.utf8.getstate()[0] + data
+                self.utf8.reset()
+        return self.gbk.decode(data)
+
+
+class _PooledClient:
+    def __init__(self, key, client):
+        self.key = key
+        self.client = client
+        self.sessions = 0
+        self.last_used = time.time()
+
+    @property
+    def is_active(self):
+        transport = self.client.get_transport()
+        return transport is not None and transport.is_active()
+
+
+class SSHPool:
+    """进程内共享的SSH连接池
+
+    同一主机、用户和密钥的SSH对象共用已建立的连接，各自在上面打开独立的会话（shell/sftp），
+    避免每次都重新握手。每个连接同时承载的会话数不超过max_sessions（OpenSSH默认MaxSessions为10，
+    每个SSH对象最多占用shell和sftp两个通道），每台主机的连接数不超过max_connections，
+    空闲超过idle_timeout的连接会被关闭，空闲连接总数超过max_idle时按最近最少使用淘汰。
+    """
+
+    def __init__(self, max_connections=4, max_sessions=4, idle_timeout=300, max_idle=200, keepalive=30,
+                 wait_timeout=30):
+        self.max_connections = max_connections
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.max_idle = max_idle
+        self.keepalive = keepalive
+        self.wait_timeout = wait_timeout
+        self.connections = {}  # key -> [_PooledClient]
+        self.idle = OrderedDict()  # 没有会话的连接，按最后使用时间排序
+        self.pending = {}  # key -> 正在建立的连接数
+        self.counters = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self.cond = threading.Condition()
+        self.reaper = None
+
+    def acquire(self, key, connect):
+        """借出一个可用连接，connect用于在没有可用连接时建立新连接"""
+        deadline = time.time() + self.wait_timeout
+        with self.cond:
+            self._start_reaper()
+            while True:
+                item = self._pick(key)
+                if item:
+                    self.counters['hits'] += 1
+                    return item.client
+                if len(self.connections.get(key, [])) + self.pending.get(key, 0) < self.max_connections:
+                    self.pending[key] = self.pending.get(key, 0) + 1
+                    self.counters['misses'] += 1
+                    break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise Exception('等待SSH连接超时，该主机的并发连接数已达上限')
+                self.cond.wait(remaining)
+
+        try:
+            client = connect()
+            client.get_transport().set_keepalive(self.keepalive)
+        except Exception:
+            with self.cond:
+                self._pending_done(key)
+            raise
+        with self.cond:
+            self._pending_done(key)
+            item = _PooledClient(key, client)
+            item.sessions = 1
+            self.connections.setdefault(key, []).append(item)
+        return client
+
+    def release(self, client):
+        """归还连接，已断开的连接直接丢弃"""
+        with self.cond:
+            item = self._find(client)
+            if item is None:
+                client.close()
+                return
+            item.sessions -= 1
+            item.last_used = time.time()
+            if not item.is_active:
+                self._remove(item)
+            elif item.sessions == 0:
+                self.idle[id(item)] = item
+                while len(self.idle) > self.max_idle:
+                    _, oldest = self.idle.popitem(last=False)
+                    self._remove(oldest, evicted=True)
+            self.cond.notify_all()
+
+    def evict_idle(self):
+        """关闭空闲超时的连接"""
+        expired = time.time() - self.idle_timeout
+        with self.cond:
+            for item in list(self.idle.values()):
+                if item.last_used < expired or not item.is_active:
+                    self._remove(item, evicted=True)
+            self.cond.notify_all()
+
+    def stats(self):
+        with self.cond:
+            items = [x for v in self.connections.values() for x in v]
+            return dict(
+                self.counters,
+                connections=len(items),
+                idle=len(self.idle),
+                sessions=sum(x.sessions for x in items),
+                hosts=len(self.connections),
+            )
+
+    def _pick(self, key):
+        candidates = []
+        for item in list(self.connections.get(key, [])):
+            if not item.is_active:
+                self._remove(item)
+            elif item.sessions < self.max_sessions:
+                candidates.append(item)
+        if candidates:
+            item = min(candidates, key=lambda x: x.sessions)
+            item.sessions += 1
+            item.last_used = time.time()
+            self.idle.pop(id(item), None)
+            return item
+
+    def _find(self, client):
+        for item in self.connections.get(getattr(client, 'pool_key', None), []):
+            if item.client is client:
+                return item
+
+    def _remove(self, item, evicted=False):
+        items = self.connections.get(item.key, [])
+        if item in items:
+            items.remove(item)
+            if not items:
+                self.connections.pop(item.key, None)
+        self.idle.pop(id(item), None)
+        if evicted:
+            self.counters['evictions'] += 1
+        item.client.close()
+
+    def _pending_done(self, key):
+        self.pending[key] -= 1
+        if not self.pending[key]:
+            self.pending.pop(key)
+        self.cond.notify_all()
+
+    def _start_reaper(self):
+        if self.reaper is None or not self.reaper.is_alive():
+            self.reaper = threading.Thread(target=self._reap, daemon=True)
+            self.reaper.start()
+
+    def _reap(self):
+        while True:
+            time.sleep(min(60, self.idle_timeout))
+            self.evict_idle()
+
+
+ssh_pool = SSHPool()
+
 
 class SSH:
     def __init__(self, hostname, port=22, username='root', pkey=None, password=None, default_env=None,
-                 connect_timeout=10, term=None):
+                 connect_timeout=10, term=None, pooled=True, shell_timeout=10):
         self.stdout = None
         self.client = None
+        self.pooled = False
         self.channel = None
         self.sftp = None
-        self.exec_file = None
         self.term = term or {}
         self.eof = 'Spug EOF 2108111926'
         self.default_env = default_env
+        self.shell_timeout = shell_timeout
         self.regex = re.compile(r'Spug EOF 2108111926 (-?\d+)[\r\n]?')
+        self.stream_regex = re.compile(r'Spug EOF 2108111926 (-?\d+)\r?\n')
         self.arguments = {
             'hostname': hostname,
             'port': port,
             'username': username,
             'password': password,
-            'pkey': RSAKey.from_private_key(StringIO(pkey)) if isinstance(pkey, str) else pkey,
+            'pkey': load_private_key(pkey) if isinstance(pkey, str) else pkey,
             'timeout': connect_timeout,
             'allow_agent': False,
             'look_for_keys': False,
             'banner_timeout': 30
         }
+        # 仅复用密钥认证的连接，密码认证一般只用于首次添加公钥
+        self.pool_key = None
+        if pooled and self.arguments['pkey']:
+            fingerprint = self.arguments['pkey'].get_fingerprint().hex()
+            self.pool_key = (hostname, port, username, fingerprint)
 
     @staticmethod
-    def generate_key():
-        key_obj = StringIO()
-        key = RSAKey.generate(2048)
-        key.write_private_key(key_obj)
-        return key_obj.getvalue(), 'ssh-rsa ' + key.get_base64()
+    def generate_key(key_type='ed25519'):
+        """生成密钥对，默认为Ed25519，需要兼容OpenSSH 6.5以下版本的主机时可指定rsa"""
+        if key_type == 'rsa':
+            key_obj = StringIO()
+            key = RSAKey.generate(2048)
+            key.write_private_key(key_obj)
+            return key_obj.getvalue(), 'ssh-rsa ' + key.get_base64()
+        key = ed25519.Ed25519PrivateKey.generate()
+        private_key = key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.OpenSSH,
+            serialization.NoEncryption()
+        )
+        public_key = key.public_key().public_bytes(serialization.Encoding.OpenSSH, serialization.PublicFormat.OpenSSH)
+        return private_key.decode(), public_key.decode()
 
     def get_client(self):
+        """返回独占的连接，由调用方负责关闭"""
         if self.client is not None:
             return self.client
-        self.client = SSHClient()
-        self.client.set_missing_host_key_policy(AutoAddPolicy)
-        self.client.connect(**self.arguments)
+        self.client = self._connect()
         return self.client
 
+    def _connect(self):
+        client = SSHClient()
+        client.set_missing_host_key_policy(AutoAddPolicy)
+        client.connect(**self.arguments)
+        client.pool_key = self.pool_key
+        return client
+
     def ping(self):
         return True
 
@@ -138,21 +363,50 @@ class SSH:
         yield channel.recv_exit_status(), self._decode(out)
 
     def exec_command_with_stream(self, command, environment=None):
+        """流式执行命令，输出按时间和大小合并成帧后返回，最后一帧携带退出状态码"""
         channel = self._get_channel()
         command = self._handle_command(command, environment)
         channel.sendall(command)
-        exit_code, line = -1, ''
+        decoder, pending, frame, flush_at = _StreamDecoder(), '', '', None
         while True:
-            line = self._decode(channel.recv(8196))
-            if not line:
+            if frame:
+                channel.settimeout(max(0, flush_at - time.time()))
+            try:
+                data = channel.recv(8196)
+            except socket.timeout:
+                data = None
+            finally:
+                channel.settimeout(None)
+            if data == b'':
                 break
-            match = self.regex.search(line)
-            if match:
-                exit_code = int(match.group(1))
-                line = line[:match.start()]
-                break
-            yield exit_code, line
-        yield exit_code, line
+            if data:
+                pending += decoder.decode(data)
+                match = self.stream_regex.search(pending)
+                if match:
+                    yield int(match.group(1)), frame + pending[:match.start()]
+                    return
+                output, pending = self._split_marker_prefix(pending)
+                if output and not frame:
+                    flush_at = time.time() + STREAM_FRAME_INTERVAL
+                frame += output
+            if frame and (len(frame) >= STREAM_FRAME_SIZE or time.time() >= flush_at):
+                yield -1, frame
+                frame = ''
+        yield -1, frame + pending
+
+    def _split_marker_prefix(self, text):
+        """拆分出可以输出的部分，末尾可能是未接收完整的结束标记的内容暂时保留"""
+        start = max(0, len(text) - len(self.eof) - 24)
+        index = text.find(self.eof[0], start)
+        while index != -1:
+            tail = text[index:]
+            if len(tail) <= len(self.eof):
+                if self.eof.startswith(tail):
+                    return text[:index], tail
+            elif tail.startswith(self.eof) and re.fullmatch(r' -?\d*\r?', tail[len(self.eof):]):
+                return text[:index], tail
+            index = text.find(self.eof[0], index + 1)
+        return text, ''
 
     def put_file(self, local_path, remote_path, callback=None):
         sftp = self._get_sftp()
@@ -178,26 +432,29 @@ class SSH:
         if self.channel:
             return self.channel
 
-        counter = 0
         self.channel = self.client.invoke_shell(**self.term)
-        command = '[ -n "$BASH_VERSION" ] && set +o history\n'
+        command = '[ -n "$BASH_VERSION" ] && set +o history && bind "set enable-bracketed-paste off" 2>/dev/null\n'
         command += '[ -n "$ZSH_VERSION" ] && set +o zle && set -o no_nomatch\n'
-        command += 'export PS1= && stty -echo\n'
+        command += 'export PS1= PS2= && stty -echo\n'
         command = self._handle_command(command, self.default_env)
         self.channel.sendall(command)
-        out = ''
-        while True:
-            if self.channel.recv_ready():
-                out += self._decode(self.channel.recv(8196))
-                if self.regex.search(out):
-                    self.stdout = self.channel.makefile('r')
-                    break
-            elif counter >= 100:
-                self.client.close()
+        # 阻塞读取直到收到结束标记，超时由shell_timeout控制
+        out, deadline = b'', time.time() + self.shell_timeout
+        while not self.regex.search(self._decode(out)):
+            data, remaining = b'', deadline - time.time()
+            if remaining > 0:
+                self.channel.settimeout(remaining)
+                try:
+                    data = self.channel.recv(8196)
+                except socket.timeout:
+                    pass
+            if not data:
+                self.channel.close()
+                self.channel = None
                 raise Exception('Wait spug response timeout')
-            else:
-                counter += 1
-                time.sleep(0.1)
+            out += data
+        self.channel.settimeout(None)
+        self.stdout = self.channel.makefile('r')
         return self.channel
 
     def _get_sftp(self):
@@ -220,19 +477,19 @@ class SSH:
         return f'export {str_envs}'
 
     def _handle_command(self, command, environment):
-        new_command = commands = ''
-        if not self.exec_file:
-            self.exec_file = f'/tmp/spug.{uuid4().hex}'
-            commands += f'trap \'rm -f {self.exec_file}\' EXIT\n'
+        """把脚本经由heredoc直接送进交互shell执行，不再上传临时文件
 
+        脚本以base64编码传输，避免其中的制表符、引号等字符被shell的行编辑器解释。
+        结束标记放在eval之外，脚本存在语法错误时也能返回退出状态码；且与eval在同一行，
+        shell在执行脚本前已读入，不会被脚本中读取标准输入的命令（如read）吞掉
+        """
+        script = ''
         env_command = self._make_env_command(environment)
         if env_command:
-            new_command += f'{env_command}\n'
-        new_command += command
-        new_command += f'\necho {self.eof} $?\n'
-        self.put_file_by_fl(StringIO(new_command), self.exec_file)
-        commands += f'. {self.exec_file}\n'
-        return commands
+            script += f'{env_command}\n'
+        script += command
+        encoded = base64.encodebytes(script.encode()).decode()
+        return f'eval "$(base64 -d <<\'SPUG_SCRIPT\'\n{encoded}SPUG_SCRIPT\n)"; echo {self.eof} $?\n'
 
     def _decode(self, content):
         try:
@@ -242,7 +499,11 @@ class SSH:
         return content
 
     def __enter__(self):
-        self.get_client()
+        if self.client is None and self.pool_key:
+            self.client = ssh_pool.acquire(self.pool_key, self._connect)
+            self.pooled = True
+        else:
+            self.get_client()
         transport = self.client.get_transport()
         if 'windows' in transport.remote_version.lower():
             self.exec_command = self.exec_command_raw
@@ -250,5 +511,13 @@ class SSH:
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.client.close()
-        self.client = None
+        if self.pooled:
+            # 只关闭本次打开的会话，连接归还给连接池
+            for item in (self.sftp, self.channel):
+                if item:
+                    item.close()
+            ssh_pool.release(self.client)
+        else:
+            self.client.close()
+        self.client = self.channel = self.sftp = self.stdout = None
+        self.pooled = False
@@ -0,0 +1,172 @@
+# Copyright: (c) OpenSpug Organization. https://github.com/openspug/spug
+# Copyright: (c) <spug.dev@gmail.com>
+# Released under the AGPL-3.0 License.
+from unittest import TestCase, skipUnless
+from libs.ssh import SSH, SSHPool
+import select
+import signal
+import socket
+import os
+
+HAS_BASH = os.path.exists('/bin/bash') and hasattr(os, 'fork')
+
+
+class PtyChannel:
+    """在本地伪终端中运行交互式bash，模拟invoke_shell返回的通道"""
+
+    def __init__(self):
+        import pty
+        self.timeout = None
+        self.pid, self.fd = pty.fork()
+        if self.pid == 0:
+            os.execv('/bin/bash', ['bash', '--norc', '--noprofile', '-i'])
+
+    def sendall(self, data):
+        data = data.encode() if isinstance(data, str) else data
+        while data:
+            data = data[os.write(self.fd, data):]
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def recv(self, size):
+        if not select.select([self.fd], [], [], self.timeout)[0]:
+            raise socket.timeout()
+        try:
+            return os.read(self.fd, size)
+        except OSError:
+            return b''
+
+    def makefile(self, mode):
+        return open(os.dup(self.fd), mode, errors='ignore')
+
+    def close(self):
+        os.kill(self.pid, signal.SIGKILL)
+        os.waitpid(self.pid, 0)
+        os.close(self.fd)
+
+
+class PtyClient:
+    def __init__(self):
+        self.channel = None
+
+    def invoke_shell(self, **kwargs):
+        self.channel = PtyChannel()
+        return self.channel
+
+
+@skipUnless(HAS_BASH, 'requires bash and pty')
+class SSHShellTest(TestCase):
+    def setUp(self):
+        # 结束标记丢失时命令会一直阻塞，超时直接失败
+        signal.signal(signal.SIGALRM, self._timeout)
+        signal.alarm(20)
+        self.ssh = SSH('localhost')
+        self.ssh.client = PtyClient()
+
+    def tearDown(self):
+        signal.alarm(0)
+        if self.ssh.stdout:
+            self.ssh.stdout.close()
+        if self.ssh.client.channel:
+            self.ssh.client.channel.close()
+
+    def _timeout(self, *args):
+        raise AssertionError('wait for spug EOF marker timeout')
+
+    def test_exec_command(self):
+        self.assertEqual(self.ssh.exec_command('cd /tmp && X=5'), (0, ''))
+        code, out = self.ssh.exec_command('echo "$X $(pwd)"; (exit 3)')
+        self.assertEqual(code, 3)
+        self.assertEqual(out.strip(), '5 /tmp')
+
+    def test_command_reads_stdin(self):
+        # 脚本读取标准输入时不能吞掉结束标记
+        code, out = self.ssh.exec_command('read -t 1 line; echo "got:[$line]"')
+        self.assertEqual(code, 0)
+        self.assertEqual(out.strip(), 'got:[]')
+        code, out = self.ssh.exec_command('echo next')
+        self.assertEqual((code, out.strip()), (0, 'next'))
+
+    def test_stream_command_reads_stdin(self):
+        frames = list(self.ssh.exec_command_with_stream('read -t 1 line; echo "got:[$line]"; (exit 4)'))
+        self.assertEqual(frames[-1][0], 4)
+        self.assertEqual(''.join(x[1] for x in frames).strip(), 'got:[]')
+
+    def test_syntax_error(self):
+        code, _ = self.ssh.exec_command('if then fi')
+        self.assertEqual(code, 2)
+
+
+class FakeTransport:
+    def __init__(self):
+        self.active = True
+
+    def set_keepalive(self, interval):
+        pass
+
+    def is_active(self):
+        return self.active
+
+
+class FakeClient:
+    def __init__(self, key):
+        self.pool_key = key
+        self.transport = FakeTransport()
+        self.closed = False
+
+    def get_transport(self):
+        return self.transport
+
+    def close(self):
+        self.closed = True
+        self.transport.active = False
+
+
+class SSHPoolTest(TestCase):
+    def setUp(self):
+        self.pool = SSHPool(max_sessions=2, max_idle=1)
+        self.pool._start_reaper = lambda: None  # 不启动后台回收线程
+
+    def acquire(self, key):
+        return self.pool.acquire(key, lambda: FakeClient(key))
+
+    def test_hits_and_misses(self):
+        first = self.acquire('a')
+        second = self.acquire('a')
+        self.assertIs(first, second)
+        third = self.acquire('a')
+        self.assertIsNot(first, third)
+        self.assertEqual(self.pool.stats(), dict(
+            hits=1, misses=2, evictions=0, connections=2, idle=0, sessions=3, hosts=1))
+
+        for client in (first, second, third):
+            self.pool.release(client)
+        # max_idle为1，先空闲的连接被淘汰
+        self.assertTrue(first.closed)
+        self.assertIs(self.acquire('a'), third)
+        self.assertEqual(self.pool.stats(), dict(
+            hits=2, misses=2, evictions=1, connections=1, idle=0, sessions=1, hosts=1))
+
+    def test_evictions(self):
+        a, b = self.acquire('a'), self.acquire('b')
+        self.pool.release(a)
+        self.pool.release(b)
+        # 空闲连接超过max_idle时淘汰最早空闲的连接
+        self.assertTrue(a.closed)
+        self.assertEqual(self.pool.stats(), dict(
+            hits=0, misses=2, evictions=1, connections=1, idle=1, sessions=0, hosts=1))
+
+        self.pool.idle_timeout = -1
+        self.pool.evict_idle()
+        self.assertTrue(b.closed)
+        stats = self.pool.stats()
+        self.assertEqual((stats['evictions'], stats['connections'], stats['hosts']), (2, 0, 0))
+
+    def test_dead_connection_not_reused(self):
+        client = self.acquire('a')
+        self.pool.release(client)
+        client.transport.active = False
+        self.assertIsNot(self.acquire('a'), client)
+        stats = self.pool.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (0, 2, 0))
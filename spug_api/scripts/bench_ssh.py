@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""测量SSH.exec_command的单条命令耗时
+
+用法: python scripts/bench_ssh.py <hostname> [-p 22] [-u root] [-i ~/.ssh/id_rsa] [-n 200]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libs.ssh import SSH
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def bench(hostname, port, username, pkey, count, command):
+    ssh = SSH(hostname, port, username, pkey, pooled=False)
+    flag = time.perf_counter()
+    with ssh:
+        connected = time.perf_counter()
+        ssh.exec_command(command)
+        ready = time.perf_counter()
+        costs = []
+        for _ in range(count):
+            start = time.perf_counter()
+            exit_code, _ = ssh.exec_command(command)
+            costs.append(time.perf_counter() - start)
+            if exit_code != 0:
+                raise Exception(f'命令执行失败，退出状态码：{exit_code}')
+
+    print(f'连接耗时: {(connected - flag) * 1000:.1f}ms')
+    print(f'首条命令（含shell初始化）: {(ready - connected) * 1000:.1f}ms')
+    print(f'单条命令 ({count}次): 平均 {sum(costs) / count * 1000:.2f}ms, '
+          f'p50 {percentile(costs, 50) * 1000:.2f}ms, p95 {percentile(costs, 95) * 1000:.2f}ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('hostname')
+    parser.add_argument('-p', '--port', type=int, default=22)
+    parser.add_argument('-u', '--username', default='root')
+    parser.add_argument('-i', '--identity', default=os.path.expanduser('~/.ssh/id_rsa'))
+    parser.add_argument('-n', '--count', type=int, default=200)
+    parser.add_argument('-c', '--command', default='echo spug')
+    args = parser.parse_args()
+
+    with open(args.identity) as f:
+        private_key = f.read()
+    bench(args.hostname, args.port, args.username, private_key, args.count, args.command)
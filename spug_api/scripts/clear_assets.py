@@ -9,6 +9,11 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'spug.settings')
 django.setup()
 
+from apps.host.utils import bump_data_version
+from apps.host.changes import log_changes
+from apps.host.projection import refresh_host_projection
+from apps.host.search import rebuild_search_index
+
 def clear_assets():
     # 获取数据库路径
     db_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'db.sqlite3')
@@ -34,6 +39,13 @@ def clear_assets():
         # 提交事务
         conn.commit()
         print("已清空所有现有资产表数据")
+        
+        # 直接写库不会触发模型信号，需要手动更新数据版本使统计缓存失效
+        bump_data_version('instance')
+        for target in ('instance', 'disk', 'ip'):
+            log_changes(target, 'reset')
+        refresh_host_projection()
+        rebuild_search_index('instance', 'disk', 'ip')
     
     except Exception as e:
         print(f"清空表时出错: {e}")
@@ -12,6 +12,8 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'spug.settings')
 django.setup()
 
 from apps.account.models import User
+from apps.host.changes import log_changes
+from apps.host.search import rebuild_search_index
 from libs import human_datetime
 
 def import_disks():
@@ -108,6 +110,10 @@ def import_disks():
     conn.commit()
     conn.close()
     
+    # 直接写库不会触发模型信号，需要手动记录变更，客户端下次同步时全量获取
+    log_changes('disk', 'reset')
+    rebuild_search_index('disk')
+    
     print(f"导入完成，成功导入 {success_count} 个磁盘")
 
 if __name__ == '__main__':
@@ -12,6 +12,8 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'spug.settings')
 django.setup()
 
 from apps.account.models import User
+from apps.host.changes import log_changes
+from apps.host.search import rebuild_search_index
 from libs import human_datetime
 
 def import_eips():
@@ -97,6 +99,10 @@ def import_eips():
     conn.commit()
     conn.close()
     
+    # 直接写库不会触发模型信号，需要手动记录变更，客户端下次同步时全量获取
+    log_changes('ip', 'reset')
+    rebuild_search_index('ip')
+    
     print(f"导入完成，成功导入 {success_count} 个IP地址")
 
 if __name__ == '__main__':
@@ -12,6 +12,10 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'spug.settings')
 django.setup()
 
 from apps.account.models import User
+from apps.host.utils import bump_data_version
+from apps.host.changes import log_changes
+from apps.host.projection import refresh_host_projection
+from apps.host.search import rebuild_search_index
 from libs import human_datetime
 
 def import_instances():
@@ -125,6 +129,12 @@ def import_instances():
     conn.commit()
     conn.close()
     
+    # 直接写库不会触发模型信号，需要手动更新数据版本使统计缓存失效
+    bump_data_version('instance')
+    log_changes('instance', 'reset')
+    refresh_host_projection()
+    rebuild_search_index('instance')
+    
     print(f"导入完成，成功导入 {success_count} 个实例")
 
 if __name__ == '__main__':